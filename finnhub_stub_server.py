@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Finnhub 本地模拟服务器
+同时提供 WebSocket 新闻推送和 REST /news 接口，用于离线测试重连和补齐逻辑
+"""
+
+import json
+import logging
+import threading
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Optional
+import websockets
+
+logger = logging.getLogger(__name__)
+
+
+class FinnhubStubServer:
+    """Finnhub 模拟服务器"""
+    
+    def __init__(self, host: str = '127.0.0.1', ws_port: int = 0, rest_port: int = 0):
+        self.host = host
+        self.ws_port = ws_port
+        self.rest_port = rest_port
+        self.news_history: List[Dict] = []  # 已发布的全部新闻
+        self.clients = set()
+        self.accepting = True  # 为 False 时拒绝新连接，模拟服务端故障
+        self.connection_count = 0
+        self.ws_server = None
+        self.http_server: Optional[ThreadingHTTPServer] = None
+        self.next_id = 1
+    
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.ws_port}"
+    
+    @property
+    def rest_url(self) -> str:
+        return f"http://{self.host}:{self.rest_port}/api/v1"
+    
+    async def start(self):
+        """启动 WebSocket 和 REST 服务"""
+        self.ws_server = await websockets.serve(self.handle_client, self.host, self.ws_port)
+        self.ws_port = self.ws_server.sockets[0].getsockname()[1]
+        
+        self.http_server = ThreadingHTTPServer((self.host, self.rest_port), self.make_rest_handler())
+        self.rest_port = self.http_server.server_address[1]
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+        logger.info(f"模拟服务器已启动: {self.ws_url} / {self.rest_url}")
+    
+    async def stop(self):
+        """停止服务"""
+        if self.ws_server:
+            self.ws_server.close()
+            await self.ws_server.wait_closed()
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+    
+    async def handle_client(self, ws):
+        """处理一个 WebSocket 客户端"""
+        if not self.accepting:
+            await ws.close(code=1013, reason='try again later')
+            return
+        
+        self.connection_count += 1
+        self.clients.add(ws)
+        try:
+            async for message in ws:
+                data = json.loads(message)
+                if data.get('type') == 'subscribe-news':
+                    logger.debug(f"客户端订阅: {data.get('symbol')}")
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.clients.discard(ws)
+    
+    async def publish(self, headline: str, category: str = 'general') -> Dict:
+        """发布一条新闻：记录到历史，并推送给当前在线的客户端"""
+        news = {
+            'id': self.next_id,
+            'category': category,
+            'datetime': 1700000000 + self.next_id,
+            'headline': headline,
+            'summary': f'{headline} 摘要',
+            'source': 'stub',
+            'url': f'https://example.com/news/{self.next_id}'
+        }
+        self.next_id += 1
+        self.news_history.append(news)
+        
+        message = json.dumps({'type': 'news', 'data': [news]})
+        for ws in list(self.clients):
+            try:
+                await ws.send(message)
+            except websockets.ConnectionClosed:
+                self.clients.discard(ws)
+        return news
+    
+    async def drop_connections(self):
+        """断开所有客户端并暂停接受新连接"""
+        self.accepting = False
+        for ws in list(self.clients):
+            await ws.close(code=1012, reason='service restart')
+        self.clients.clear()
+    
+    def resume(self):
+        """恢复接受新连接"""
+        self.accepting = True
+    
+    def make_rest_handler(self):
+        """生成 REST /news 接口的请求处理类"""
+        server = self
+        
+        class RestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path != '/api/v1/news':
+                    self.send_error(404)
+                    return
+                
+                query = parse_qs(parsed.query)
+                category = query.get('category', ['general'])[0]
+                min_id = int(query.get('minId', ['0'])[0])
+                news_list = [
+                    news for news in server.news_history
+                    if news['category'] == category and news['id'] > min_id
+                ]
+                news_list.sort(key=lambda x: x['id'], reverse=True)
+                
+                body = json.dumps(news_list).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return RestHandler
+
+
+async def main():
+    """独立运行模拟服务器，每 5 秒发布一条新闻"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = FinnhubStubServer(ws_port=8765, rest_port=8766)
+    await server.start()
+    try:
+        while True:
+            news = await server.publish(f'模拟新闻 {server.next_id}')
+            logger.info(f"已发布: {news['headline']}")
+            await asyncio.sleep(5)
+    finally:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -12,18 +12,37 @@ load_dotenv()
 
 import os
 import sys
+import argparse
+import importlib.util
 import time
 import logging
 import threading
 import json
-from datetime import datetime, timedelta
+import hashlib
+import heapq
+import re
+import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from collections import deque
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Set, Optional
 import requests
+import pandas as pd
 import tushare as ts
+import websockets
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import TelegramError, TimedOut, RetryAfter, BadRequest, Forbidden, ChatMigrated
+from telegram.request import HTTPXRequest
 import asyncio
 
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，不使用进程锁
+    fcntl = None
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -55,9 +74,113 @@ SOURCE_NAMES = {
     'finnhub_general': 'Finnhub 综合新闻',
     'finnhub_forex': 'Finnhub 外汇新闻',
     'finnhub_crypto': 'Finnhub 加密货币',
-    'finnhub_merger': 'Finnhub 并购新闻'
+    'finnhub_merger': 'Finnhub 并购新闻',
+    'finnhub_stream': 'Finnhub 实时新闻'
 }
 
+# RSS/Atom 订阅源（来源标识 -> 地址），通过 RSS_FEEDS 环境变量注册
+RSS_FEEDS: Dict[str, str] = {}
+
+
+def parse_rss_feeds(spec: str) -> Dict[str, tuple]:
+    """解析 RSS/Atom 订阅源配置，格式为 `标识|名称|地址`，多个订阅源用分号分隔"""
+    feeds = {}
+    for item in spec.split(';'):
+        item = item.strip()
+        if not item:
+            continue
+        
+        parts = [part.strip() for part in item.split('|', 2)]
+        if len(parts) != 3 or not all(parts):
+            logger.error(f"RSS 订阅源配置格式错误: {item}")
+            continue
+        
+        key, name, url = parts
+        feeds[key] = (name, url)
+    return feeds
+
+
+def register_rss_feeds(spec: str):
+    """注册 RSS/Atom 订阅源到 RSS_FEEDS 和 SOURCE_NAMES"""
+    for key, (name, url) in parse_rss_feeds(spec).items():
+        RSS_FEEDS[key] = url
+        SOURCE_NAMES[key] = name
+
+
+# TuShare 返回的时间为北京时间（不带时区）
+TUSHARE_TIMEZONE = timezone(timedelta(hours=8))
+
+
+@lru_cache(maxsize=4096)
+def parse_tushare_time(value: str) -> Optional[float]:
+    """将 TuShare 的北京时间字符串转换为 UTC 时间戳"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=TUSHARE_TIMEZONE).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def parse_feed_time(value: str) -> Optional[float]:
+    """将 RSS（RFC 822）或 Atom（ISO 8601）时间转换为 UTC 时间戳，不带时区时按 UTC 处理"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def event_time(news: Dict) -> float:
+    """新闻的发布时间（UTC 时间戳），未知时为 0"""
+    return news.get('event_time') or 0
+
+
+def merge_by_event_time(candidates: List[tuple]) -> List[tuple]:
+    """按来源分成各自有序的队列，再按发布时间多路归并（从旧到新）
+
+    candidates 中每项为 (新闻ID, 新闻, 来源类型)
+    """
+    streams: Dict[str, List[tuple]] = {}
+    for candidate in candidates:
+        news = candidate[1]
+        streams.setdefault(news.get('src') or news.get('source_key', ''), []).append(candidate)
+    
+    for stream in streams.values():
+        stream.sort(key=lambda c: event_time(c[1]))
+    return list(heapq.merge(*streams.values(), key=lambda c: event_time(c[1])))
+
+
+def tushare_news_id(news: Dict) -> str:
+    """生成 TuShare 新闻的唯一ID（标题摘要在不同进程间保持一致）"""
+    title_digest = hashlib.md5(str(news.get('title', '')).encode('utf-8')).hexdigest()[:16]
+    return f"tushare_{news.get('src', '')}_{news.get('datetime', '')}_{title_digest}"
+
+
+def finnhub_news_id(news: Dict) -> str:
+    """生成 Finnhub 新闻的唯一ID（轮询、实时推送和重连补齐共用，同一条新闻只推送一次）"""
+    return f"finnhub_{news.get('id', '')}"
+
+
+# 旧版本的 Finnhub 新闻ID：轮询为 finnhub_{id}_{类别}，实时推送为 finnhub_stream_{id}
+LEGACY_FINNHUB_ID = re.compile(r'^finnhub_(?:stream_(\d+)|(\d+)_[a-z]+)$')
+
+
+def migrate_news_id(news_id: str) -> str:
+    """把旧格式的新闻ID转换为当前格式，其他ID原样返回"""
+    match = LEGACY_FINNHUB_ID.match(news_id)
+    if match:
+        return f"finnhub_{match.group(1) or match.group(2)}"
+    return news_id
+
 
 class NewsTracker:
     """新闻追踪器 - 记录已推送的新闻，避免重复"""
@@ -73,7 +196,8 @@ class NewsTracker:
             try:
                 with open(self.history_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.news_ids = set(data.get('ids', []))
+                    # 兼容旧格式的新闻ID，升级后不会重复推送已推送过的新闻
+                    self.news_ids = set(migrate_news_id(news_id) for news_id in data.get('ids', []))
                     logger.info(f"加载了 {len(self.news_ids)} 条历史新闻记录")
             except Exception as e:
                 logger.error(f"加载历史记录失败: {e}")
@@ -95,45 +219,392 @@ class NewsTracker:
         """标记新闻为已推送"""
         self.news_ids.add(news_id)
         self.save_history()
+    
+    def mark_many_as_sent(self, news_ids: List[str]):
+        """批量标记新闻为已推送，只写一次文件"""
+        if news_ids:
+            self.news_ids.update(news_ids)
+            self.save_history()
+
+
+class NewsOutbox:
+    """新闻发件箱 - 推送前先持久化为待发送，推送成功后再确认，保证崩溃后可重试"""
+    
+    def __init__(self, outbox_file: str = 'news_outbox.json', max_attempts: int = 300, retry_delay: float = 5.0,
+                 max_retry_delay: float = 300.0, dead_letter_file: str = 'news_dead_letter.jsonl'):
+        self.outbox_file = outbox_file
+        self.max_attempts = max_attempts  # 按退避上限计算约为一天
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.dead_letter_file = dead_letter_file
+        self.pending: Dict[str, Dict] = {}  # 以新闻ID为幂等键
+        self.load_outbox()
+    
+    def load_outbox(self):
+        """从文件加载待发送记录"""
+        if os.path.exists(self.outbox_file):
+            try:
+                with open(self.outbox_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.pending = {}
+                    for entry in data.get('pending', []):
+                        entry['id'] = migrate_news_id(entry['id'])
+                        self.pending[entry['id']] = entry
+                    if self.pending:
+                        logger.info(f"发件箱中有 {len(self.pending)} 条待发送新闻")
+            except Exception as e:
+                logger.error(f"加载发件箱失败: {e}")
+                self.pending = {}
+    
+    def save_outbox(self):
+        """保存待发送记录到文件（先写临时文件再替换，避免写到一半崩溃）"""
+        try:
+            tmp_file = f"{self.outbox_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'pending': list(self.pending.values())}, f, ensure_ascii=False, default=str)
+            os.replace(tmp_file, self.outbox_file)
+        except Exception as e:
+            logger.error(f"保存发件箱失败: {e}")
+    
+    def contains(self, news_id: str) -> bool:
+        """检查新闻是否已在发件箱中"""
+        return news_id in self.pending
+    
+    def enqueue(self, news_id: str, news: Dict, source_type: str, save: bool = True) -> bool:
+        """将新闻记录为待发送，重复的新闻ID会被忽略"""
+        if news_id in self.pending:
+            return False
+        self.pending[news_id] = {
+            'id': news_id,
+            'source_type': source_type,
+            'news': news,
+            'attempts': 0,
+            'next_attempt_at': 0,
+            'created_at': time.time(),
+            'delivered': []  # 已发送成功的 Chat ID，重试时跳过
+        }
+        if save:
+            self.save_outbox()
+        return True
+    
+    def due_entries(self, now: Optional[float] = None) -> List[Dict]:
+        """获取已到重试时间的待发送新闻（按入队顺序）"""
+        if now is None:
+            now = time.time()
+        return [entry for entry in self.pending.values() if entry['next_attempt_at'] <= now]
+    
+    def ack(self, news_id: str):
+        """确认新闻已发送，从发件箱移除"""
+        if self.pending.pop(news_id, None) is not None:
+            self.save_outbox()
+    
+    def undelivered_chats(self, news_id: str, chat_ids: List[str]) -> List[str]:
+        """获取该新闻尚未发送成功的 Chat ID"""
+        delivered = self.pending[news_id].get('delivered', []) if news_id in self.pending else []
+        return [chat_id for chat_id in chat_ids if chat_id not in delivered]
+    
+    def nack(self, news_id: str, delivered: Optional[List[str]] = None, retry_after: Optional[float] = None):
+        """记录一次发送失败（以及本次已发送成功的 Chat ID），按有上限的指数退避安排重试，超过最大次数则移入死信文件
+        
+        被电报限流时按 retry_after 等待，不计入失败次数
+        """
+        entry = self.pending.get(news_id)
+        if entry is None:
+            return
+        
+        entry.setdefault('delivered', []).extend(delivered or [])
+        if retry_after is not None:
+            entry['next_attempt_at'] = time.time() + retry_after
+            logger.warning(f"新闻 {news_id} 被电报限流，{retry_after:.0f} 秒后重试")
+            self.save_outbox()
+            return
+        
+        entry['attempts'] += 1
+        if entry['attempts'] >= self.max_attempts:
+            logger.error(f"新闻 {news_id} 发送失败 {entry['attempts']} 次，移入死信文件 {self.dead_letter_file}")
+            self.dead_letter(entry)
+            del self.pending[news_id]
+        else:
+            delay = min(self.max_retry_delay, self.retry_delay * (2 ** min(entry['attempts'] - 1, 16)))
+            entry['next_attempt_at'] = time.time() + delay
+            logger.warning(f"新闻 {news_id} 发送失败，{delay:.0f} 秒后第 {entry['attempts'] + 1} 次尝试")
+        self.save_outbox()
+    
+    def reject(self, news_id: str, delivered: Optional[List[str]], reason: str):
+        """重试也不会成功的新闻（如消息格式错误）直接移入死信文件"""
+        entry = self.pending.pop(news_id, None)
+        if entry is None:
+            return
+        
+        entry.setdefault('delivered', []).extend(delivered or [])
+        logger.error(f"新闻 {news_id} 无法发送（{reason}），移入死信文件 {self.dead_letter_file}")
+        self.dead_letter(entry, reason)
+        self.save_outbox()
+    
+    def dead_letter(self, entry: Dict, reason: str = ''):
+        """把放弃重试的新闻追加到死信文件，便于人工检查和补发"""
+        try:
+            with open(self.dead_letter_file, 'a', encoding='utf-8') as f:
+                record = dict(entry, failed_at=time.time(), reason=reason)
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        except Exception as e:
+            logger.error(f"写入死信文件失败: {e}")
+
+
+class LatencyTracer:
+    """延迟追踪 - 记录每条新闻从发布、获取、入队到推送的时间，可导出为 JSONL"""
+    
+    STAGES = ('published', 'fetched', 'deduped', 'sent')
+    STAGE_NAMES = {'fetched': '获取', 'deduped': '入队', 'sent': '推送'}
+    
+    def __init__(self, trace_file: Optional[str] = None, window: int = 1000):
+        self.trace_file = trace_file
+        self.records = deque(maxlen=window)  # 最近的追踪记录，用于统计
+        self.total = 0
+    
+    def record(self, entry: Dict, sent_at: Optional[float] = None) -> Dict:
+        """记录一条已推送新闻的各阶段时间（UTC 时间戳）"""
+        news = entry['news']
+        trace = {
+            'id': entry['id'],
+            'source': news.get('src') or news.get('source_key') or entry['source_type'],
+            'published': news.get('event_time'),
+            'fetched': news.get('fetched_at'),
+            'deduped': entry.get('created_at'),
+            'sent': sent_at if sent_at is not None else time.time()
+        }
+        self.records.append(trace)
+        self.total += 1
+        
+        if self.trace_file:
+            try:
+                with open(self.trace_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(trace, ensure_ascii=False) + '\n')
+            except Exception as e:
+                logger.error(f"写入延迟追踪记录失败: {e}")
+        return trace
+    
+    @staticmethod
+    def percentile(values: List[float], ratio: float) -> float:
+        """已排序列表的分位数（最近秩）"""
+        return values[min(len(values) - 1, int(ratio * len(values)))]
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """最近记录中各阶段相对发布时间的延迟（秒）：p50 / p95 / max"""
+        result = {}
+        for stage in self.STAGES[1:]:
+            delays = sorted(
+                trace[stage] - trace['published'] for trace in self.records
+                if trace['published'] and trace[stage] is not None
+            )
+            if delays:
+                result[stage] = {
+                    'count': len(delays),
+                    'p50': self.percentile(delays, 0.5),
+                    'p95': self.percentile(delays, 0.95),
+                    'max': delays[-1]
+                }
+        return result
+
+
+class StateLock:
+    """状态文件锁 - 机器人和回填命令都会改写历史记录和发件箱，同一时间只允许一个进程运行"""
+    
+    def __init__(self, lock_file: str = 'quickfinews.lock'):
+        self.lock_file = lock_file
+        self.handle = None
+    
+    def acquire(self) -> bool:
+        """尝试获取锁，已被其他进程持有时返回 False（进程退出后系统自动释放）"""
+        if fcntl is None:
+            return True
+        handle = open(self.lock_file, 'a+')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self.handle = handle
+        return True
+    
+    def release(self):
+        """释放锁"""
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """带统计的电报连接池 - 记录等待空闲连接的时间和连接池占满的次数"""
+    
+    def __init__(self, connection_pool_size: int, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+        self.pool_size = connection_pool_size
+        self.pool_timeout = kwargs.get('pool_timeout', 1.0)  # 与 httpx 一致，None 表示一直等待
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.saturated = 0  # 发起请求时连接池已占满的次数
+        self.pool_timeouts = 0  # 等待空闲连接超时的次数
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    async def do_request(self, *args, **kwargs):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.pool_size)
+        
+        # 单次请求指定的等待超时优先，否则使用创建时的 pool_timeout
+        pool_timeout = kwargs.get('pool_timeout')
+        if isinstance(pool_timeout, bool) or not isinstance(pool_timeout, (int, float)):
+            pool_timeout = self.pool_timeout
+        
+        if self.in_flight >= self.pool_size:
+            self.saturated += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=pool_timeout)
+        except asyncio.TimeoutError:
+            self.pool_timeouts += 1
+            raise TimedOut(f"等待空闲连接超过 {pool_timeout} 秒")
+        
+        try:
+            wait_time = time.monotonic() - started
+            self.requests += 1
+            self.total_wait += wait_time
+            self.max_wait = max(self.max_wait, wait_time)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                return await super().do_request(*args, **kwargs)
+            finally:
+                self.in_flight -= 1
+        finally:
+            self.slots.release()
+    
+    def stats(self) -> Dict:
+        """连接池使用情况"""
+        return {
+            'pool_size': self.pool_size,
+            'requests': self.requests,
+            'peak_in_flight': self.peak_in_flight,
+            'saturated': self.saturated,
+            'pool_timeouts': self.pool_timeouts,
+            'avg_wait_ms': self.total_wait / self.requests * 1000 if self.requests else 0.0,
+            'max_wait_ms': self.max_wait * 1000
+        }
 
 
 class TelegramNotifier:
     """电报通知器"""
     
-    def __init__(self, token: str, chat_id: str):
+    def __init__(self, token: str, chat_id: str, pool_size: int = 8, http2: bool = False,
+                 connect_timeout: float = 5.0, read_timeout: float = 10.0, write_timeout: float = 10.0,
+                 pool_timeout: float = 5.0, api_url: Optional[str] = None):
         self.token = token
-        self.chat_id = chat_id
-        self.bot = Bot(token=token)
+        # 支持逗号分隔的多个 Chat ID，共用同一个连接池
+        self.chat_ids = [cid.strip() for cid in str(chat_id).split(',') if cid.strip()]
+        self.chat_id = self.chat_ids[0] if self.chat_ids else chat_id
+        
+        if http2 and importlib.util.find_spec('h2') is None:
+            logger.warning("未安装 h2，无法启用 HTTP/2，改用 HTTP/1.1（可通过 pip install httpx[http2] 安装）")
+            http2 = False
+        
+        self.request = InstrumentedRequest(
+            connection_pool_size=pool_size,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            write_timeout=write_timeout,
+            pool_timeout=pool_timeout,
+            http_version='2' if http2 else '1.1'
+        )
+        
+        bot_kwargs = {}
+        if api_url:
+            # 使用本地 Bot API 服务器
+            api_url = api_url.rstrip('/')
+            bot_kwargs = {
+                'base_url': f"{api_url}/bot",
+                'base_file_url': f"{api_url}/file/bot",
+                'local_mode': True
+            }
+        self.bot = Bot(token=token, request=self.request, **bot_kwargs)
     
-    async def send_message(self, text: str) -> bool:
-        """发送消息到电报"""
+    async def send_to_chat(self, chat_id: str, text: str) -> Optional[Exception]:
+        """发送消息到单个聊天，成功返回 None，失败返回异常"""
         try:
             await self.bot.send_message(
-                chat_id=self.chat_id,
+                chat_id=chat_id,
                 text=text,
                 parse_mode='HTML'
             )
-            logger.info(f"消息已发送到电报 (Chat ID: {self.chat_id})")
-            return True
+            logger.info(f"消息已发送到电报 (Chat ID: {chat_id})")
+            return None
         except TelegramError as e:
-            logger.error(f"发送电报消息失败: {e}")
-            return False
+            logger.error(f"发送电报消息失败 (Chat ID: {chat_id}): {e}")
+            return e
+    
+    async def send_to_chats(self, text: str, chat_ids: List[str]) -> Dict[str, Optional[Exception]]:
+        """并发发送消息到指定聊天，返回每个 Chat ID 的发送结果（None 表示成功）"""
+        results = await asyncio.gather(*(self.send_to_chat(chat_id, text) for chat_id in chat_ids))
+        return dict(zip(chat_ids, results))
+    
+    async def send_message(self, text: str) -> bool:
+        """发送消息到所有聊天，全部成功才返回 True"""
+        results = await self.send_to_chats(text, self.chat_ids)
+        return all(error is None for error in results.values())
     
     async def send_news(self, news: Dict, source_type: str = 'tushare') -> bool:
-        """发送新闻到电报"""
+        """发送新闻到所有聊天，全部成功才返回 True"""
+        results = await self.send_news_to_chats(news, source_type, self.chat_ids)
+        return all(error is None for error in results.values())
+    
+    async def send_news_to_chats(self, news: Dict, source_type: str,
+                                 chat_ids: List[str]) -> Dict[str, Optional[Exception]]:
+        """发送新闻到指定聊天，返回每个 Chat ID 的发送结果（None 表示成功）"""
+        if not chat_ids:
+            return {}
         try:
-            if source_type == 'tushare':
-                # TuShare 新闻格式
-                source = SOURCE_NAMES.get(news.get('src', ''), news.get('src', ''))
-                title = news.get('title', '无标题')
-                content = news.get('content', '')
-                datetime_str = news.get('datetime', '')
-                
-                # 限制内容长度
-                if len(content) > 200:
-                    content = content[:200] + "..."
-                
-                message = f"""
+            text = self.format_news(news, source_type)
+        except Exception as e:
+            logger.error(f"格式化新闻失败: {e}")
+            return {chat_id: e for chat_id in chat_ids}
+        return await self.send_to_chats(text, chat_ids)
+    
+    @staticmethod
+    def is_permanent_error(error: Exception) -> bool:
+        """重试也不会成功的错误：消息格式错误、机器人被移出或聊天已迁移、新闻无法格式化"""
+        if isinstance(error, (BadRequest, Forbidden, ChatMigrated)):
+            return True
+        return not isinstance(error, TelegramError)
+    
+    @staticmethod
+    def retry_after_seconds(error: Exception) -> Optional[float]:
+        """电报限流（RetryAfter）要求等待的秒数，其他错误返回 None"""
+        if not isinstance(error, RetryAfter):
+            return None
+        value = error.retry_after
+        return value.total_seconds() if isinstance(value, timedelta) else float(value)
+    
+    def format_news(self, news: Dict, source_type: str) -> str:
+        """把新闻格式化为电报消息"""
+        if source_type == 'tushare':
+            # TuShare 新闻格式
+            source = SOURCE_NAMES.get(news.get('src', ''), news.get('src', ''))
+            title = news.get('title', '无标题')
+            content = news.get('content', '')
+            datetime_str = news.get('datetime', '')
+            
+            # 限制内容长度
+            if len(content) > 200:
+                content = content[:200] + "..."
+            
+            message = f"""
 <b>📰 {source}</b>
 <b>{title}</b>
 
@@ -141,25 +612,46 @@ class TelegramNotifier:
 
 <i>{datetime_str}</i>
 """
-            else:
-                # Finnhub 新闻格式
-                source = SOURCE_NAMES.get(news.get('source_key', ''), 'Finnhub')
-                headline = news.get('headline', '无标题')
-                summary = news.get('summary', '')
-                url = news.get('url', '')
-                datetime_ts = news.get('datetime', 0)
-                datetime_str = datetime.fromtimestamp(datetime_ts).strftime('%Y-%m-%d %H:%M:%S')
-                
-                # 清理 HTML 标签
-                import re
-                summary = re.sub(r'<[^>]+>', '', summary)
-                headline = re.sub(r'<[^>]+>', '', headline)
-                
-                # 限制摘要长度
-                if len(summary) > 200:
-                    summary = summary[:200] + "..."
-                
-                message = f"""
+        elif source_type == 'rss':
+            # RSS/Atom 新闻格式
+            source = SOURCE_NAMES.get(news.get('src', ''), news.get('src', ''))
+            title = re.sub(r'<[^>]+>', '', news.get('title', '') or '无标题')
+            summary = re.sub(r'<[^>]+>', '', news.get('summary', ''))
+            url = news.get('link', '')
+            datetime_str = news.get('datetime', '')
+            
+            # 限制摘要长度
+            if len(summary) > 200:
+                summary = summary[:200] + "..."
+            
+            message = f"""
+<b>📢 {source}</b>
+<b>{title}</b>
+
+{summary}
+
+<a href="{url}">阅读原文</a>
+
+<i>{datetime_str}</i>
+"""
+        else:
+            # Finnhub 新闻格式
+            source = SOURCE_NAMES.get(news.get('source_key', ''), 'Finnhub')
+            headline = news.get('headline', '无标题')
+            summary = news.get('summary', '')
+            url = news.get('url', '')
+            datetime_ts = news.get('datetime', 0)
+            datetime_str = datetime.fromtimestamp(datetime_ts).strftime('%Y-%m-%d %H:%M:%S')
+            
+            # 清理 HTML 标签
+            summary = re.sub(r'<[^>]+>', '', summary)
+            headline = re.sub(r'<[^>]+>', '', headline)
+            
+            # 限制摘要长度
+            if len(summary) > 200:
+                summary = summary[:200] + "..."
+            
+            message = f"""
 <b>🌐 {source}</b>
 <b>{headline}</b>
 
@@ -169,103 +661,648 @@ class TelegramNotifier:
 
 <i>{datetime_str}</i>
 """
-            
-            await self.send_message(message)
+        
+        return message
+
+
+class CircuitBreaker:
+    """熔断器 - 记录单个新闻来源的健康状况，连续失败后暂时跳过该来源"""
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.total_successes = 0
+        self.total_failures = 0
+        self.total_skipped = 0
+    
+    def is_available(self) -> bool:
+        """检查来源当前是否可以请求（不改变状态）"""
+        if self.state == self.CLOSED:
             return True
-        except Exception as e:
-            logger.error(f"发送新闻失败: {e}")
+        if self.state == self.OPEN:
+            return time.time() - self.opened_at >= self.reset_timeout
+        return not self.probe_in_flight
+    
+    def allow_request(self) -> bool:
+        """申请发起一次请求；熔断冷却结束后只放行一个探测请求"""
+        if not self.is_available():
+            self.total_skipped += 1
             return False
+        if self.state != self.CLOSED:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = True
+            logger.info(f"来源 {self.name} 熔断冷却结束，发送探测请求")
+        return True
+    
+    def release(self):
+        """请求未真正发出（如没有可用的 Token），释放探测名额，不改变状态"""
+        self.probe_in_flight = False
+    
+    def record_success(self):
+        """记录一次成功请求"""
+        self.total_successes += 1
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        if self.state != self.CLOSED:
+            logger.info(f"来源 {self.name} 已恢复，关闭熔断")
+            self.state = self.CLOSED
+    
+    def record_failure(self):
+        """记录一次失败请求，达到阈值或探测失败时打开熔断"""
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"来源 {self.name} 连续失败 {self.consecutive_failures} 次，熔断 {self.reset_timeout:.0f} 秒")
+            self.state = self.OPEN
+            self.opened_at = time.time()
+
+
+class CredentialError(Exception):
+    """没有可用的 Token，或 Token 被限流/无权限"""
+
+
+class CredentialPool:
+    """Token 池 - 多个 Token 轮换使用，优先选择剩余额度最多的 Token，被限流或无权限时暂时隔离"""
+    
+    def __init__(self, provider: str, tokens: List[str], calls_per_minute: int, quarantine_seconds: float = 300.0):
+        self.provider = provider
+        self.tokens = tokens
+        self.calls_per_minute = calls_per_minute
+        self.quarantine_seconds = quarantine_seconds
+        self.lock = threading.Lock()
+        self.recent_calls = {token: deque() for token in tokens}  # 最近一分钟的调用时间
+        self.remaining_hint: Dict[str, tuple] = {}  # 服务端返回的剩余额度 (剩余次数, 重置时间)
+        self.quarantined_until = {token: 0.0 for token in tokens}
+        self.calls = {token: 0 for token in tokens}
+        self.errors = {token: 0 for token in tokens}
+        self.quarantines = {token: 0 for token in tokens}
+    
+    @staticmethod
+    def parse_tokens(value: str) -> List[str]:
+        """解析逗号分隔的 Token 列表"""
+        return [token.strip() for token in value.split(',') if token.strip()]
+    
+    @staticmethod
+    def mask(token: str) -> str:
+        """隐藏 Token 的大部分内容，用于日志"""
+        return f"{token[:6]}..."
+    
+    def _headroom(self, token: str, now: float) -> int:
+        """计算 Token 当前的剩余额度"""
+        calls = self.recent_calls[token]
+        while calls and now - calls[0] >= 60:
+            calls.popleft()
+        headroom = self.calls_per_minute - len(calls)
+        
+        hint = self.remaining_hint.get(token)
+        if hint is not None:
+            remaining, reset_at = hint
+            if now < reset_at:
+                headroom = min(headroom, remaining)
+            else:
+                del self.remaining_hint[token]
+        return headroom
+    
+    def acquire(self) -> Optional[str]:
+        """选择剩余额度最多的 Token 并记录一次调用，没有可用 Token 时返回 None"""
+        with self.lock:
+            now = time.time()
+            best_token = None
+            best_headroom = 0
+            for token in self.tokens:
+                if self.quarantined_until[token] > now:
+                    continue
+                headroom = self._headroom(token, now)
+                if headroom > best_headroom:
+                    best_token, best_headroom = token, headroom
+            
+            if best_token is not None:
+                self.recent_calls[best_token].append(now)
+                self.calls[best_token] += 1
+                hint = self.remaining_hint.get(best_token)
+                if hint is not None:
+                    self.remaining_hint[best_token] = (hint[0] - 1, hint[1])
+            return best_token
+    
+    def update_remaining(self, token: str, remaining: int, reset_at: float):
+        """根据服务端返回的限流信息更新剩余额度"""
+        with self.lock:
+            self.remaining_hint[token] = (remaining, reset_at)
+    
+    def quarantine(self, token: str, reason: str):
+        """暂时隔离被限流或无权限的 Token"""
+        with self.lock:
+            self.errors[token] += 1
+            self.quarantines[token] += 1
+            self.quarantined_until[token] = time.time() + self.quarantine_seconds
+        logger.warning(f"{self.provider} Token {self.mask(token)} 暂停使用 {self.quarantine_seconds:.0f} 秒: {reason}")
+    
+    def stats(self) -> Dict[str, Dict]:
+        """每个 Token 的使用情况"""
+        with self.lock:
+            now = time.time()
+            return {
+                self.mask(token): {
+                    'calls': self.calls[token],
+                    'errors': self.errors[token],
+                    'quarantines': self.quarantines[token],
+                    'headroom': self._headroom(token, now),
+                    'quarantined': self.quarantined_until[token] > now
+                }
+                for token in self.tokens
+            }
+
+
+def hedged_call(executor: Optional[ThreadPoolExecutor], func, token: str, acquire=None, hedge_delay: float = 0):
+    """对冲请求：首个请求超过 hedge_delay 秒未返回时再发一个相同请求，取先成功的结果
+    
+    func 以 Token 为参数；对冲请求通过 acquire() 另行申请 Token 并计入调用次数，没有剩余额度时不发送。
+    返回 (实际使用的 Token, 结果)，全部失败时抛出首个请求的异常
+    """
+    if executor is None or hedge_delay <= 0:
+        return token, func(token)
+    
+    first = executor.submit(func, token)
+    done, _ = wait([first], timeout=hedge_delay)
+    if done:
+        return token, first.result()
+    
+    hedge_token = acquire() if acquire is not None else None
+    if hedge_token is None:
+        logger.debug("没有剩余额度，不发送对冲请求")
+        return token, first.result()
+    
+    logger.debug(f"请求超过 {hedge_delay} 秒未返回，发送对冲请求")
+    second = executor.submit(func, hedge_token)
+    tokens = {first: token, second: hedge_token}
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return tokens[future], future.result()
+    return token, first.result()
+
+
+class ResponseCache:
+    """响应缓存 - 按来源记录上次响应内容的哈希，内容未变化时跳过解析和后续处理"""
+    
+    def __init__(self):
+        self.digests: Dict[str, str] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.bytes_skipped = 0
+    
+    def is_unchanged(self, key: str, payload: bytes) -> bool:
+        """检查来源的响应是否与上次相同，并记录本次哈希"""
+        digest = hashlib.sha256(payload).hexdigest()
+        if self.digests.get(key) == digest:
+            self.hits[key] = self.hits.get(key, 0) + 1
+            self.bytes_skipped += len(payload)
+            return True
+        
+        self.digests[key] = digest
+        self.misses[key] = self.misses.get(key, 0) + 1
+        return False
+    
+    def hit_rate(self) -> float:
+        """总命中率"""
+        hits = sum(self.hits.values())
+        total = hits + sum(self.misses.values())
+        return hits / total if total else 0.0
+    
+    def stats(self) -> Dict:
+        """命中率统计"""
+        return {
+            'hits': sum(self.hits.values()),
+            'misses': sum(self.misses.values()),
+            'hit_rate': self.hit_rate(),
+            'bytes_skipped': self.bytes_skipped
+        }
 
 
 class TuShareCollector:
     """TuShare 新闻收集器"""
     
-    def __init__(self, tushare_token: str):
-        ts.set_token(tushare_token)
-        self.pro = ts.pro_api()
+    # TuShare 限流或无权限时的错误信息关键字
+    CREDENTIAL_ERROR_KEYWORDS = ('每分钟最多访问', '每天最多访问', '权限', 'token')
+    
+    def __init__(self, tushare_token: str, hedge_delay: float = 0, calls_per_minute: int = 100,
+                 sources: Optional[List[str]] = None):
+        # 支持逗号分隔的多个 Token
+        tokens = CredentialPool.parse_tokens(tushare_token)
+        ts.set_token(tokens[0])
+        self.clients = {token: ts.pro_api(token) for token in tokens}
+        self.pro = self.clients[tokens[0]]
+        self.credentials = CredentialPool('TuShare', tokens, calls_per_minute)
+        self.hedge_delay = hedge_delay
+        self.executor = ThreadPoolExecutor(max_workers=2) if hedge_delay > 0 else None
+        self.sources = list(sources or TUSHARE_SOURCES)
+        self.breakers = {src: CircuitBreaker(src) for src in self.sources}
+        self.response_cache = ResponseCache()
+    
+    def set_hedge_delay(self, hedge_delay: float):
+        """修改对冲请求延迟，按需创建或关闭线程池，保留 Token 池、熔断和缓存状态"""
+        self.hedge_delay = hedge_delay
+        if hedge_delay > 0 and self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=2)
+        elif hedge_delay <= 0 and self.executor is not None:
+            self.close()
+    
+    def close(self):
+        """关闭对冲请求线程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
     
     def get_news(self, src: str, start_date: str, end_date: str) -> List[Dict]:
         """获取指定来源的新闻"""
+        breaker = self.breakers.setdefault(src, CircuitBreaker(src))
+        if not breaker.allow_request():
+            logger.debug(f"{SOURCE_NAMES.get(src, src)} 处于熔断状态，跳过")
+            return []
+        
         try:
-            df = self.pro.news(src=src, start_date=start_date, end_date=end_date)
+            df = self.call_news(src, start_date, end_date)
+            breaker.record_success()
             if df is None or df.empty:
                 return []
             
+            # 与上次返回的数据完全相同时跳过后续处理
+            payload = pd.util.hash_pandas_object(df, index=True).values.tobytes()
+            if self.response_cache.is_unchanged(src, payload):
+                logger.debug(f"{SOURCE_NAMES.get(src, src)} 返回数据未变化，跳过")
+                return []
+            
             # 转换为字典列表
             news_list = df.to_dict('records')
             for news in news_list:
                 news['src'] = src
+                news['event_time'] = parse_tushare_time(news.get('datetime', ''))
             logger.info(f"从 {SOURCE_NAMES.get(src, src)} 获取了 {len(news_list)} 条新闻")
             return news_list
+        except CredentialError as e:
+            # Token 问题不代表来源故障，不计入熔断
+            breaker.release()
+            logger.warning(f"获取 {src} 新闻跳过: {e}")
+            return []
         except Exception as e:
+            breaker.record_failure()
             logger.error(f"获取 {src} 新闻失败: {e}")
             return []
     
+    def call_news(self, src: str, start_date: str, end_date: str):
+        """使用额度最多的 Token 调用 news 接口，被限流或无权限时隔离该 Token 并抛出 CredentialError"""
+        token = self.credentials.acquire()
+        if token is None:
+            raise CredentialError("没有可用的 TuShare Token")
+        
+        try:
+            _, df = hedged_call(
+                self.executor,
+                lambda t: self.clients[t].news(src=src, start_date=start_date, end_date=end_date),
+                token, self.credentials.acquire, self.hedge_delay
+            )
+            return df
+        except Exception as e:
+            message = str(e).lower()
+            if any(keyword in message for keyword in self.CREDENTIAL_ERROR_KEYWORDS):
+                self.credentials.quarantine(token, str(e))
+                raise CredentialError(str(e)) from e
+            raise
+    
     def get_all_news(self, start_date: str, end_date: str) -> List[Dict]:
         """获取所有来源的新闻"""
         all_news = []
-        for source in TUSHARE_SOURCES:
+        for source in self.sources:
+            # 熔断中的来源直接跳过，不占用等待时间
+            breaker = self.breakers.get(source)
+            if breaker is not None and not breaker.is_available():
+                breaker.total_skipped += 1
+                continue
+            
             news = self.get_news(source, start_date, end_date)
             all_news.extend(news)
             # 避免请求过快
             time.sleep(1)
         
-        # 按时间排序
-        all_news.sort(key=lambda x: x.get('datetime', ''), reverse=True)
+        # 按发布时间排序
+        all_news.sort(key=event_time, reverse=True)
         return all_news
 
 
+class RateLimiter:
+    """限流器 - 多线程共享，保证每分钟调用次数不超过配额"""
+    
+    def __init__(self, calls_per_minute: int):
+        self.interval = 60.0 / calls_per_minute if calls_per_minute > 0 else 0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """等待直到可以发起下一次调用"""
+        with self.lock:
+            now = time.monotonic()
+            wait_time = max(0.0, self.next_slot - now)
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class TuShareBackfill:
+    """TuShare 历史新闻回填 - 按来源和时间分块并行获取，记录检查点以便中断后继续"""
+    
+    # TuShare news 接口单次最多返回的条数，达到该数量说明可能被截断
+    MAX_ROWS_PER_CALL = 1500
+    
+    def __init__(self, collector: TuShareCollector, tracker: NewsTracker,
+                 outbox: Optional[NewsOutbox] = None,
+                 archive_file: str = 'news_archive.jsonl',
+                 checkpoint_file: str = 'backfill_checkpoint.json',
+                 workers: int = 4, calls_per_minute: int = 100,
+                 chunk_hours: float = 6, max_retries: int = 3):
+        self.collector = collector
+        self.tracker = tracker
+        self.outbox = outbox  # 设置后回填的新闻会写入发件箱推送，否则只标记为已推送
+        self.archive_file = archive_file
+        self.checkpoint_file = checkpoint_file
+        self.workers = workers
+        self.rate_limiter = RateLimiter(calls_per_minute)
+        self.chunk = timedelta(hours=chunk_hours)
+        self.max_retries = max_retries
+        self.completed: Set[str] = set()
+        self.load_checkpoint()
+    
+    def load_checkpoint(self):
+        """加载已完成的分块"""
+        if os.path.exists(self.checkpoint_file):
+            try:
+                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                    self.completed = set(json.load(f).get('completed', []))
+                    logger.info(f"检查点中已完成 {len(self.completed)} 个分块")
+            except Exception as e:
+                logger.error(f"加载回填检查点失败: {e}")
+                self.completed = set()
+    
+    def save_checkpoint(self):
+        """保存已完成的分块（先写临时文件再替换）"""
+        try:
+            tmp_file = f"{self.checkpoint_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'completed': sorted(self.completed)}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.checkpoint_file)
+        except Exception as e:
+            logger.error(f"保存回填检查点失败: {e}")
+    
+    @staticmethod
+    def chunk_key(src: str, start: datetime, end: datetime) -> str:
+        return f"{src}|{start:%Y-%m-%d %H:%M:%S}|{end:%Y-%m-%d %H:%M:%S}"
+    
+    def plan_chunks(self, start: datetime, end: datetime, sources: List[str]) -> List[tuple]:
+        """按来源和时间切分回填任务，跳过已完成的分块"""
+        chunks = []
+        for src in sources:
+            chunk_start = start
+            while chunk_start < end:
+                chunk_end = min(chunk_start + self.chunk, end)
+                if self.chunk_key(src, chunk_start, chunk_end) not in self.completed:
+                    chunks.append((src, chunk_start, chunk_end))
+                chunk_start = chunk_end
+        return chunks
+    
+    def fetch_window(self, src: str, start: datetime, end: datetime) -> List[Dict]:
+        """获取一个时间窗口的新闻，结果可能被截断时拆成两半分别获取"""
+        for attempt in range(1, self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                df = self.collector.call_news(
+                    src,
+                    start.strftime('%Y-%m-%d %H:%M:%S'),
+                    end.strftime('%Y-%m-%d %H:%M:%S')
+                )
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"回填 {src} {start} ~ {end} 失败 (第 {attempt} 次): {e}")
+                time.sleep(2 ** attempt)
+        
+        if df is None or df.empty:
+            return []
+        
+        if len(df) >= self.MAX_ROWS_PER_CALL and end - start > timedelta(minutes=10):
+            middle = start + (end - start) / 2
+            return self.fetch_window(src, start, middle) + self.fetch_window(src, middle, end)
+        
+        news_list = df.to_dict('records')
+        for news in news_list:
+            news['src'] = src
+        return news_list
+    
+    def store(self, news_list: List[Dict]) -> int:
+        """将一个分块的新闻写入归档和去重记录，返回新增数量"""
+        new_ids = []
+        with open(self.archive_file, 'a', encoding='utf-8') as f:
+            for news in news_list:
+                news_id = tushare_news_id(news)
+                if not self.tracker.is_new(news_id) or (self.outbox and self.outbox.contains(news_id)):
+                    continue
+                f.write(json.dumps(news, ensure_ascii=False, default=str) + '\n')
+                if self.outbox:
+                    self.outbox.enqueue(news_id, news, 'tushare', save=False)
+                new_ids.append(news_id)
+        
+        if self.outbox:
+            self.outbox.save_outbox()
+        else:
+            self.tracker.mark_many_as_sent(new_ids)
+        return len(new_ids)
+    
+    def run(self, start: datetime, end: datetime, sources: Optional[List[str]] = None) -> Dict:
+        """执行回填，逐个分块写入结果，返回统计信息"""
+        sources = sources or TUSHARE_SOURCES
+        chunks = self.plan_chunks(start, end, sources)
+        logger.info(f"回填 {start} ~ {end}: {len(sources)} 个来源, 待处理 {len(chunks)} 个分块")
+        
+        stats = {'chunks': len(chunks), 'completed': 0, 'failed': 0, 'fetched': 0, 'stored': 0}
+        started_at = time.monotonic()
+        pending = {}
+        chunk_iter = iter(chunks)
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # 同时在途的分块数量有限，结果逐块写出，不在内存中累积
+            def submit_next():
+                item = next(chunk_iter, None)
+                if item is not None:
+                    pending[executor.submit(self.fetch_window, *item)] = item
+            
+            for _ in range(self.workers * 2):
+                submit_next()
+            
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    src, chunk_start, chunk_end = pending.pop(future)
+                    try:
+                        news_list = future.result()
+                    except Exception as e:
+                        stats['failed'] += 1
+                        logger.error(f"回填 {src} {chunk_start} ~ {chunk_end} 失败: {e}")
+                    else:
+                        stats['fetched'] += len(news_list)
+                        stats['stored'] += self.store(news_list)
+                        stats['completed'] += 1
+                        self.completed.add(self.chunk_key(src, chunk_start, chunk_end))
+                        self.save_checkpoint()
+                        logger.info(
+                            f"[{stats['completed'] + stats['failed']}/{stats['chunks']}] "
+                            f"{SOURCE_NAMES.get(src, src)} {chunk_start} ~ {chunk_end}: {len(news_list)} 条"
+                        )
+                    submit_next()
+        
+        stats['elapsed'] = time.monotonic() - started_at
+        logger.info(
+            f"回填完成: 成功 {stats['completed']} 个分块, 失败 {stats['failed']} 个, "
+            f"获取 {stats['fetched']} 条, 新增 {stats['stored']} 条, 耗时 {stats['elapsed']:.1f} 秒"
+        )
+        return stats
+
+
 class FinnhubCollector:
     """Finnhub 新闻收集器"""
     
-    def __init__(self, finnhub_token: str):
-        self.token = finnhub_token
+    def __init__(self, finnhub_token: str, hedge_delay: float = 0, calls_per_minute: int = 60,
+                 categories: Optional[List[str]] = None):
+        # 支持逗号分隔的多个 Token
+        tokens = CredentialPool.parse_tokens(finnhub_token)
+        self.token = tokens[0]
+        self.credentials = CredentialPool('Finnhub', tokens, calls_per_minute)
         self.base_url = 'https://finnhub.io/api/v1'
         self.last_check_times = {}  # 记录每个类别的最后检查时间
+        self.hedge_delay = hedge_delay
+        self.executor = ThreadPoolExecutor(max_workers=2) if hedge_delay > 0 else None
+        self.categories = list(categories or FINNHUB_CATEGORIES)
+        self.breakers = {f'finnhub_{c}': CircuitBreaker(f'finnhub_{c}') for c in self.categories}
+        self.response_cache = ResponseCache()
+    
+    def set_hedge_delay(self, hedge_delay: float):
+        """修改对冲请求延迟，按需创建或关闭线程池，保留 Token 池、熔断和缓存状态"""
+        self.hedge_delay = hedge_delay
+        if hedge_delay > 0 and self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=2)
+        elif hedge_delay <= 0 and self.executor is not None:
+            self.close()
+    
+    def close(self):
+        """关闭对冲请求线程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
     
     def get_news(self, category: str = 'general', min_id: int = 0) -> List[Dict]:
         """获取指定类别的新闻"""
+        source_key = f'finnhub_{category}'
+        breaker = self.breakers.setdefault(source_key, CircuitBreaker(source_key))
+        if not breaker.allow_request():
+            logger.debug(f"Finnhub {category} 处于熔断状态，跳过")
+            return []
+        
+        token = self.credentials.acquire()
+        if token is None:
+            breaker.release()
+            logger.warning(f"获取 Finnhub {category} 新闻跳过: 没有可用的 Finnhub Token")
+            return []
+        
         try:
             url = f"{self.base_url}/news"
             params = {
-                'category': category,
-                'token': self.token
+                'category': category
             }
             
             if min_id > 0:
                 params['minId'] = min_id
             
-            response = requests.get(url, params=params, timeout=10)
+            # 对冲请求另行申请 Token，返回实际得到响应的 Token
+            token, response = hedged_call(
+                self.executor,
+                lambda t: requests.get(url, params=dict(params, token=t), timeout=10),
+                token, self.credentials.acquire, self.hedge_delay
+            )
+            
+            # 根据响应头更新该 Token 的剩余额度
+            remaining = response.headers.get('X-Ratelimit-Remaining')
+            reset_at = response.headers.get('X-Ratelimit-Reset')
+            if remaining is not None and reset_at is not None:
+                try:
+                    self.credentials.update_remaining(token, int(remaining), float(reset_at))
+                except ValueError:
+                    logger.debug(f"Finnhub 限流响应头格式错误: {remaining} / {reset_at}")
+            
+            # 限流或无权限时隔离该 Token，不计入熔断
+            if response.status_code in (401, 403, 429):
+                self.credentials.quarantine(token, f"HTTP {response.status_code}")
+                breaker.release()
+                return []
+            
             response.raise_for_status()
             
+            # 与上次返回的内容完全相同时跳过解析和后续处理（带 minId 的补拉请求不走缓存）
+            if min_id <= 0 and self.response_cache.is_unchanged(source_key, response.content):
+                breaker.record_success()
+                logger.debug(f"Finnhub {category} 返回内容未变化，跳过")
+                return []
+            
             news_list = response.json()
             
             if not isinstance(news_list, list):
+                breaker.record_failure()
                 logger.error(f"Finnhub API 返回格式错误: {news_list}")
                 return []
             
+            breaker.record_success()
+            
             # 添加来源标识
             for news in news_list:
-                news['source_key'] = f'finnhub_{category}'
+                news['source_key'] = source_key
+                news['event_time'] = float(news.get('datetime') or 0) or None
                 news['category_name'] = category
             
             logger.info(f"从 Finnhub {category} 获取了 {len(news_list)} 条新闻")
             return news_list
             
         except requests.exceptions.RequestException as e:
+            breaker.record_failure()
             logger.error(f"获取 Finnhub {category} 新闻失败: {e}")
             return []
         except Exception as e:
+            breaker.record_failure()
             logger.error(f"处理 Finnhub {category} 新闻失败: {e}")
             return []
     
     def get_all_news(self, categories: List[str] = None) -> List[Dict]:
         """获取所有类别的新闻"""
         if categories is None:
-            categories = FINNHUB_CATEGORIES
+            categories = self.categories
         
         all_news = []
         for category in categories:
+            # 熔断中的类别直接跳过，不占用等待时间
+            breaker = self.breakers.get(f'finnhub_{category}')
+            if breaker is not None and not breaker.is_available():
+                breaker.total_skipped += 1
+                continue
+            
             news = self.get_news(category)
             all_news.extend(news)
             # 避免请求过快
@@ -276,23 +1313,603 @@ class FinnhubCollector:
         return all_news
 
 
+class RSSCollector:
+    """RSS/Atom 新闻收集器 - 使用条件请求，增量解析到第一条已见过的条目即停止"""
+    
+    def __init__(self, feeds: Dict[str, str], max_seen: int = 500):
+        self.feeds = feeds
+        self.max_seen = max_seen
+        self.validators: Dict[str, Dict[str, str]] = {}  # 每个订阅源的 ETag / Last-Modified
+        self.seen_ids: Dict[str, Dict[str, None]] = {}  # 每个订阅源已见过的条目ID（按插入顺序）
+        self.breakers = {key: CircuitBreaker(key) for key in feeds}
+        self.not_modified_count = 0
+    
+    @staticmethod
+    def _local_name(tag: str) -> str:
+        """去掉 XML 命名空间"""
+        return tag.rsplit('}', 1)[-1]
+    
+    def _parse_entry(self, elem: ET.Element, key: str) -> Dict:
+        """解析 RSS <item> 或 Atom <entry>"""
+        fields = {}
+        link = ''
+        for child in elem:
+            name = self._local_name(child.tag)
+            if name == 'link':
+                # RSS 的链接在文本中，Atom 的链接在 href 属性中
+                href = child.get('href')
+                if href and child.get('rel', 'alternate') == 'alternate':
+                    link = href
+                elif child.text and not link:
+                    link = child.text.strip()
+            elif name not in fields:
+                fields[name] = (child.text or '').strip()
+        
+        entry_id = fields.get('guid') or fields.get('id') or link or fields.get('title', '')
+        published = fields.get('pubDate') or fields.get('published') or fields.get('updated') or fields.get('date', '')
+        return {
+            'src': key,
+            'id': entry_id,
+            'title': fields.get('title', ''),
+            'summary': fields.get('description') or fields.get('summary') or fields.get('content', ''),
+            'link': link,
+            'datetime': published,
+            'event_time': parse_feed_time(published)
+        }
+    
+    def get_news(self, key: str) -> List[Dict]:
+        """获取指定订阅源的新条目（从新到旧）"""
+        url = self.feeds[key]
+        breaker = self.breakers.setdefault(key, CircuitBreaker(key))
+        if not breaker.allow_request():
+            logger.debug(f"{SOURCE_NAMES.get(key, key)} 处于熔断状态，跳过")
+            return []
+        
+        headers = {}
+        validators = self.validators.get(key, {})
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        
+        try:
+            with requests.get(url, headers=headers, timeout=10, stream=True) as response:
+                if response.status_code == 304:
+                    breaker.record_success()
+                    self.not_modified_count += 1
+                    logger.debug(f"{SOURCE_NAMES.get(key, key)} 未更新")
+                    return []
+                response.raise_for_status()
+                
+                # 增量解析，遇到第一条已见过的条目就停止读取
+                seen = self.seen_ids.get(key)
+                first_fetch = seen is None
+                if first_fetch:
+                    seen = {}
+                
+                response.raw.decode_content = True
+                news_list = []
+                for _, elem in ET.iterparse(response.raw, events=('end',)):
+                    if self._local_name(elem.tag) not in ('item', 'entry'):
+                        continue
+                    
+                    news = self._parse_entry(elem, key)
+                    elem.clear()
+                    if news['id'] in seen:
+                        break
+                    news_list.append(news)
+                
+                # 解析成功后才保存校验信息，否则下次请求会得到 304 而漏掉这次的条目
+                self.validators[key] = {
+                    'etag': response.headers.get('ETag', ''),
+                    'last_modified': response.headers.get('Last-Modified', '')
+                }
+            
+            breaker.record_success()
+        except Exception as e:
+            # 直接读取 response.raw 时，urllib3 的异常（如 ProtocolError）不会被包装为 RequestException
+            breaker.record_failure()
+            logger.error(f"获取 {SOURCE_NAMES.get(key, key)} 订阅源失败: {e}")
+            return []
+        
+        self.seen_ids[key] = seen
+        for news in reversed(news_list):
+            seen[news['id']] = None
+        while len(seen) > self.max_seen:
+            del seen[next(iter(seen))]
+        
+        # 首次获取时只推送最新一条，避免批量推送历史条目
+        if first_fetch:
+            news_list = news_list[:1]
+        
+        if news_list:
+            logger.info(f"从 {SOURCE_NAMES.get(key, key)} 获取了 {len(news_list)} 条新闻")
+        return news_list
+    
+    def get_all_news(self) -> List[Dict]:
+        """获取所有订阅源的新条目"""
+        all_news = []
+        for key in self.feeds:
+            # 熔断中的订阅源直接跳过，不占用等待时间
+            breaker = self.breakers.get(key)
+            if breaker is not None and not breaker.is_available():
+                breaker.total_skipped += 1
+                continue
+            
+            all_news.extend(self.get_news(key))
+        return all_news
+
+
+class FinnhubStreamCollector:
+    """Finnhub 实时新闻收集器 - 通过 WebSocket 订阅新闻推送，断线后自动重连并用 REST 接口补齐遗漏的新闻"""
+    
+    def __init__(self, finnhub_token: str, symbols: List[str], rest_collector: FinnhubCollector,
+                 on_news, ws_url: str = 'wss://ws.finnhub.io',
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, gap_fill_limit: int = 10):
+        self.token = finnhub_token
+        self.symbols = symbols
+        self.rest_collector = rest_collector
+        self.on_news = on_news  # 异步回调，接收单条新闻
+        self.ws_url = ws_url
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.gap_fill_limit = gap_fill_limit  # 每次重连最多补推的新闻数，避免长时间断线后刷屏
+        self.running = False
+        self.last_news_id = 0  # 已收到的最大新闻ID，用于重连后补齐
+        self.reconnect_count = 0
+        self.gap_filled_count = 0
+    
+    async def run(self):
+        """保持 WebSocket 订阅，断线后按带抖动的指数退避重连"""
+        self.running = True
+        attempt = 0
+        connected_before = False
+        connected_at = None
+        
+        while self.running:
+            try:
+                async with websockets.connect(f"{self.ws_url}?token={self.token}") as ws:
+                    logger.info(f"已连接 Finnhub 实时新闻: {', '.join(self.symbols)}")
+                    connected_at = time.monotonic()
+                    
+                    for symbol in self.symbols:
+                        await ws.send(json.dumps({'type': 'subscribe-news', 'symbol': symbol}))
+                    
+                    # 重连（或配置变更后接着原来的进度订阅）时先补齐遗漏的新闻
+                    if connected_before:
+                        self.reconnect_count += 1
+                    if connected_before or self.last_news_id > 0:
+                        await self.fill_gap()
+                    connected_before = True
+                    
+                    async for message in ws:
+                        await self.handle_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Finnhub 实时新闻连接断开: {e}")
+            
+            # 连接稳定保持过一段时间才重置退避，避免服务端握手后立即断开时频繁重连
+            if connected_at is not None and time.monotonic() - connected_at >= self.backoff_max:
+                attempt = 0
+            connected_at = None
+            
+            if not self.running:
+                break
+            
+            # 全抖动退避，避免大量客户端同时重连
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+            attempt += 1
+            logger.info(f"{delay:.1f} 秒后重连 Finnhub 实时新闻 (第 {attempt} 次)")
+            await asyncio.sleep(delay)
+    
+    async def handle_message(self, message: str):
+        """处理一条 WebSocket 消息"""
+        try:
+            data = json.loads(message)
+        except ValueError:
+            logger.error(f"Finnhub 实时新闻消息格式错误: {message[:100]}")
+            return
+        
+        if data.get('type') != 'news':
+            return
+        
+        for news in data.get('data', []):
+            await self.emit(news)
+    
+    async def emit(self, news: Dict):
+        """记录新闻ID并交给下游处理"""
+        news_id = news.get('id', 0)
+        if isinstance(news_id, int) and news_id > self.last_news_id:
+            self.last_news_id = news_id
+        news.setdefault('source_key', 'finnhub_stream')
+        news.setdefault('category_name', 'stream')
+        news.setdefault('event_time', float(news.get('datetime') or 0) or None)
+        news.setdefault('fetched_at', time.time())
+        await self.on_news(news)
+    
+    async def fill_gap(self):
+        """通过 REST 接口获取断线期间遗漏的新闻"""
+        if self.last_news_id <= 0:
+            return
+        
+        min_id = self.last_news_id
+        loop = asyncio.get_running_loop()
+        missed = []
+        for category in self.rest_collector.categories:
+            news_list = await loop.run_in_executor(None, self.rest_collector.get_news, category, min_id)
+            missed.extend(news for news in news_list if news.get('id', 0) > min_id)
+        
+        # 只补推最新的若干条，按ID从旧到新推送
+        missed.sort(key=lambda x: x.get('id', 0))
+        skipped = max(0, len(missed) - self.gap_fill_limit)
+        missed = missed[skipped:]
+        for news in missed:
+            news['source_key'] = 'finnhub_stream'
+            await self.emit(news)
+        
+        self.gap_filled_count += len(missed)
+        if missed:
+            logger.info(f"重连后补齐了 {len(missed)} 条 Finnhub 新闻")
+        if skipped:
+            logger.info(f"断线期间的另外 {skipped} 条较早的 Finnhub 新闻未补推")
+    
+    def stop(self):
+        """停止订阅"""
+        self.running = False
+
+
+# 可配置项及默认值：先读取环境变量，再由配置文件覆盖
+CONFIG_DEFAULTS = {
+    'TUSHARE_TOKEN': '',
+    'FINNHUB_TOKEN': '',
+    'TELEGRAM_TOKEN': '',
+    'TELEGRAM_CHAT_ID': '',
+    'CHECK_INTERVAL': 60,
+    'HEDGE_DELAY': 0.0,
+    'TUSHARE_SOURCES': ','.join(TUSHARE_SOURCES),
+    'FINNHUB_CATEGORIES': ','.join(FINNHUB_CATEGORIES),
+    'FINNHUB_STREAM_SYMBOLS': '',
+    'FINNHUB_STREAM_URL': 'wss://ws.finnhub.io',
+    'RSS_FEEDS': '',
+    'TELEGRAM_POOL_SIZE': 8,
+    'TELEGRAM_HTTP2': False,
+    'TELEGRAM_CONNECT_TIMEOUT': 5.0,
+    'TELEGRAM_READ_TIMEOUT': 10.0,
+    'TELEGRAM_WRITE_TIMEOUT': 10.0,
+    'TELEGRAM_POOL_TIMEOUT': 5.0,
+    'TELEGRAM_API_URL': '',
+    'TRACE_FILE': ''
+}
+
+
+def split_config_list(value: str) -> List[str]:
+    """拆分逗号分隔的配置项"""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def load_config(config_file: Optional[str] = None, require_bot: bool = True) -> Dict:
+    """读取配置：环境变量为基础，配置文件（JSON）中的同名项覆盖环境变量；格式错误时抛出 ValueError
+    
+    require_bot 为 False 时不检查电报和新闻来源配置（用于回填命令）
+    """
+    raw = {key: os.getenv(key, default) for key, default in CONFIG_DEFAULTS.items()}
+    
+    if config_file and os.path.exists(config_file):
+        with open(config_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("配置文件必须是 JSON 对象")
+        unknown = set(data) - set(CONFIG_DEFAULTS)
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(sorted(unknown))}")
+        raw.update(data)
+    
+    config = {}
+    for key, default in CONFIG_DEFAULTS.items():
+        value = raw[key]
+        try:
+            if isinstance(default, bool):
+                config[key] = value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+            elif isinstance(default, int):
+                config[key] = int(value)
+            elif isinstance(default, float):
+                config[key] = float(value)
+            elif isinstance(value, list):
+                config[key] = ','.join(str(item) for item in value)
+            else:
+                config[key] = str(value) if value is not None else ''
+        except (TypeError, ValueError):
+            raise ValueError(f"配置项 {key} 无效: {value!r}")
+    
+    if config['CHECK_INTERVAL'] <= 0:
+        raise ValueError("CHECK_INTERVAL 必须大于 0")
+    if not require_bot:
+        return config
+    if not config['TELEGRAM_TOKEN']:
+        raise ValueError("未设置 TELEGRAM_TOKEN")
+    if not config['TELEGRAM_CHAT_ID']:
+        raise ValueError("未设置 TELEGRAM_CHAT_ID")
+    if not config['TUSHARE_TOKEN'] and not config['FINNHUB_TOKEN'] and not config['RSS_FEEDS'].strip():
+        raise ValueError("至少需要设置 TUSHARE_TOKEN、FINNHUB_TOKEN 或 RSS_FEEDS 中的一个")
+    return config
+
+
+def telegram_options_from_config(config: Dict) -> Dict:
+    """从配置中提取电报连接参数"""
+    return {
+        'pool_size': config['TELEGRAM_POOL_SIZE'],
+        'http2': config['TELEGRAM_HTTP2'],
+        'connect_timeout': config['TELEGRAM_CONNECT_TIMEOUT'],
+        'read_timeout': config['TELEGRAM_READ_TIMEOUT'],
+        'write_timeout': config['TELEGRAM_WRITE_TIMEOUT'],
+        'pool_timeout': config['TELEGRAM_POOL_TIMEOUT'],
+        'api_url': config['TELEGRAM_API_URL'] or None
+    }
+
+
+class ConfigWatcher:
+    """配置文件监视器 - 文件修改后重新读取配置，格式错误时保留原配置"""
+    
+    def __init__(self, config_file: str):
+        self.config_file = config_file
+        self.last_signature = self.signature()
+    
+    def signature(self) -> Optional[tuple]:
+        """文件的修改时间和大小，文件不存在时为 None"""
+        try:
+            stat = os.stat(self.config_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def poll(self) -> Optional[Dict]:
+        """文件有变化时返回新配置，否则返回 None"""
+        signature = self.signature()
+        if signature == self.last_signature:
+            return None
+        self.last_signature = signature
+        
+        try:
+            return load_config(self.config_file)
+        except (ValueError, OSError) as e:
+            logger.error(f"重新加载配置失败，继续使用原配置: {e}")
+            return None
+
+
 class NewsBot:
     """新闻机器人 - 主控制器"""
     
-    def __init__(self, tushare_token: str, finnhub_token: str, telegram_token: str, telegram_chat_id: str):
-        self.tushare_collector = TuShareCollector(tushare_token) if tushare_token else None
-        self.finnhub_collector = FinnhubCollector(finnhub_token) if finnhub_token else None
-        self.notifier = TelegramNotifier(telegram_token, telegram_chat_id)
+    def __init__(self, tushare_token: str, finnhub_token: str, telegram_token: str, telegram_chat_id: str,
+                 hedge_delay: float = 0, stream_symbols: Optional[List[str]] = None,
+                 stream_url: str = 'wss://ws.finnhub.io', telegram_options: Optional[Dict] = None,
+                 tushare_sources: Optional[List[str]] = None, finnhub_categories: Optional[List[str]] = None,
+                 cursor_file: str = 'news_cursor.json', trace_file: Optional[str] = None):
+        self.tushare_collector = TuShareCollector(
+            tushare_token, hedge_delay, sources=tushare_sources
+        ) if tushare_token else None
+        self.finnhub_collector = FinnhubCollector(
+            finnhub_token, hedge_delay, categories=finnhub_categories
+        ) if finnhub_token else None
+        self.rss_collector = RSSCollector(dict(RSS_FEEDS)) if RSS_FEEDS else None
+        self.finnhub_stream = None
+        self.stream_task = None
+        self.create_stream(stream_symbols, stream_url)
+        self.notifier = TelegramNotifier(telegram_token, telegram_chat_id, **(telegram_options or {}))
         self.tracker = NewsTracker()
+        self.outbox = NewsOutbox()
+        self.tracer = LatencyTracer(trace_file or None)
+        self.outbox_event = asyncio.Event()
+        self.send_lock = asyncio.Lock()  # 切换通知器时等待正在进行的推送完成
+        self.flood_until = 0.0  # 被电报限流时暂停发送到该时间
         self.running = False
-        self.last_check_time = datetime.now() - timedelta(minutes=5)
+        self.check_interval = 60
+        self.cycle_count = 0
+        self.stats_log_cycles = 60  # 每隔多少轮输出一次缓存、Token、连接池和延迟统计
+        self.config: Optional[Dict] = None
+        self.config_watcher: Optional[ConfigWatcher] = None
+        self.cursor_file = cursor_file
+        self.last_check_time = self.load_cursor()
         self.last_finnhub_ids = {}  # 记录每个类别的最后新闻ID
     
-    async def check_and_push_tushare_news(self):
-        """检查并推送 TuShare 新闻"""
-        if not self.tushare_collector:
+    @classmethod
+    def from_config(cls, config: Dict) -> 'NewsBot':
+        """根据配置创建机器人"""
+        RSS_FEEDS.clear()
+        register_rss_feeds(config['RSS_FEEDS'])
+        bot = cls(
+            config['TUSHARE_TOKEN'], config['FINNHUB_TOKEN'], config['TELEGRAM_TOKEN'], config['TELEGRAM_CHAT_ID'],
+            hedge_delay=config['HEDGE_DELAY'],
+            stream_symbols=split_config_list(config['FINNHUB_STREAM_SYMBOLS']),
+            stream_url=config['FINNHUB_STREAM_URL'],
+            telegram_options=telegram_options_from_config(config),
+            tushare_sources=split_config_list(config['TUSHARE_SOURCES']),
+            finnhub_categories=split_config_list(config['FINNHUB_CATEGORIES']),
+            trace_file=config['TRACE_FILE']
+        )
+        bot.config = config
+        bot.check_interval = config['CHECK_INTERVAL']
+        return bot
+    
+    def load_cursor(self) -> datetime:
+        """读取上次检查时间，重启后从断点继续；没有记录或超过一天时只检查最近5分钟"""
+        default = datetime.now() - timedelta(minutes=5)
+        if os.path.exists(self.cursor_file):
+            try:
+                with open(self.cursor_file, 'r', encoding='utf-8') as f:
+                    cursor = datetime.strptime(json.load(f)['last_check_time'], '%Y-%m-%d %H:%M:%S')
+                if datetime.now() - cursor <= timedelta(days=1):
+                    logger.info(f"从上次检查时间继续: {cursor}")
+                    return cursor
+            except Exception as e:
+                logger.error(f"加载检查时间失败: {e}")
+        return default
+    
+    def save_cursor(self):
+        """保存上次检查时间"""
+        try:
+            tmp_file = f"{self.cursor_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'last_check_time': self.last_check_time.strftime('%Y-%m-%d %H:%M:%S')}, f)
+            os.replace(tmp_file, self.cursor_file)
+        except Exception as e:
+            logger.error(f"保存检查时间失败: {e}")
+    
+    def create_stream(self, stream_symbols: Optional[List[str]], stream_url: str):
+        """创建 Finnhub 实时新闻收集器（未配置时为 None）"""
+        self.finnhub_stream = None
+        if self.finnhub_collector and stream_symbols:
+            self.finnhub_stream = FinnhubStreamCollector(
+                self.finnhub_collector.token, stream_symbols, self.finnhub_collector,
+                on_news=self.handle_stream_news, ws_url=stream_url
+            )
+    
+    def start_stream(self):
+        """启动实时新闻订阅任务"""
+        if self.finnhub_stream and self.stream_task is None:
+            self.stream_task = asyncio.create_task(self.finnhub_stream.run())
+    
+    async def stop_stream(self):
+        """停止实时新闻订阅任务"""
+        if self.finnhub_stream:
+            self.finnhub_stream.stop()
+        if self.stream_task is not None:
+            self.stream_task.cancel()
+            try:
+                await self.stream_task
+            except asyncio.CancelledError:
+                pass
+            self.stream_task = None
+    
+    async def apply_config(self, config: Dict):
+        """在两轮检查之间应用新配置：先创建有变化的组件，全部成功后再一次性切换，保留检查时间、发件箱和熔断状态"""
+        old = self.config or {}
+        changed = set(key for key in config if config[key] != old.get(key))
+        if not changed:
             return
         
+        tushare_sources = split_config_list(config['TUSHARE_SOURCES'])
+        finnhub_categories = split_config_list(config['FINNHUB_CATEGORIES'])
+        
+        # 第一步：创建新组件，出错时不改变任何运行状态（只有 Token 变化时才重建收集器）
+        tushare_collector = self.tushare_collector
+        if 'TUSHARE_TOKEN' in changed:
+            tushare_collector = TuShareCollector(
+                config['TUSHARE_TOKEN'], config['HEDGE_DELAY'], sources=tushare_sources
+            ) if config['TUSHARE_TOKEN'] else None
+        
+        finnhub_collector = self.finnhub_collector
+        finnhub_rebuilt = 'FINNHUB_TOKEN' in changed
+        if finnhub_rebuilt:
+            finnhub_collector = FinnhubCollector(
+                config['FINNHUB_TOKEN'], config['HEDGE_DELAY'], categories=finnhub_categories
+            ) if config['FINNHUB_TOKEN'] else None
+        
+        # 重建的收集器沿用原来的熔断状态和响应缓存
+        replaced_collectors = []
+        for old_collector, new_collector in ((self.tushare_collector, tushare_collector),
+                                             (self.finnhub_collector, finnhub_collector)):
+            if old_collector is not None and old_collector is not new_collector:
+                replaced_collectors.append(old_collector)
+                if new_collector is not None:
+                    new_collector.breakers.update(old_collector.breakers)
+                    new_collector.response_cache = old_collector.response_cache
+        
+        rss_feeds = parse_rss_feeds(config['RSS_FEEDS'])
+        
+        notifier = self.notifier
+        if any(key.startswith('TELEGRAM_') for key in changed):
+            notifier = TelegramNotifier(
+                config['TELEGRAM_TOKEN'], config['TELEGRAM_CHAT_ID'], **telegram_options_from_config(config)
+            )
+        
+        # 第二步：等待正在进行的推送完成后再切换
+        async with self.send_lock:
+            self.tushare_collector = tushare_collector
+            if self.tushare_collector:
+                self.tushare_collector.set_hedge_delay(config['HEDGE_DELAY'])
+                self.tushare_collector.sources = tushare_sources
+                for src in tushare_sources:
+                    self.tushare_collector.breakers.setdefault(src, CircuitBreaker(src))
+            
+            self.finnhub_collector = finnhub_collector
+            if self.finnhub_collector:
+                self.finnhub_collector.set_hedge_delay(config['HEDGE_DELAY'])
+                self.finnhub_collector.categories = finnhub_categories
+                for category in finnhub_categories:
+                    key = f'finnhub_{category}'
+                    self.finnhub_collector.breakers.setdefault(key, CircuitBreaker(key))
+            
+            if 'RSS_FEEDS' in changed:
+                RSS_FEEDS.clear()
+                for key, (name, url) in rss_feeds.items():
+                    RSS_FEEDS[key] = url
+                    SOURCE_NAMES[key] = name
+                if not RSS_FEEDS:
+                    self.rss_collector = None
+                elif self.rss_collector:
+                    # 保留未变化订阅源的 ETag 和已见条目
+                    self.rss_collector.feeds = dict(RSS_FEEDS)
+                    for key in RSS_FEEDS:
+                        self.rss_collector.breakers.setdefault(key, CircuitBreaker(key))
+                else:
+                    self.rss_collector = RSSCollector(dict(RSS_FEEDS))
+            
+            old_notifier = self.notifier
+            self.notifier = notifier
+            self.tracer.trace_file = config['TRACE_FILE'] or None
+            self.check_interval = config['CHECK_INTERVAL']
+            self.config = config
+        
+        for collector in replaced_collectors:
+            collector.close()
+        
+        if finnhub_rebuilt or {'FINNHUB_STREAM_SYMBOLS', 'FINNHUB_STREAM_URL'} & changed:
+            # 新的订阅从原来的进度继续，重连后补齐重启期间遗漏的新闻
+            last_news_id = self.finnhub_stream.last_news_id if self.finnhub_stream else 0
+            await self.stop_stream()
+            self.create_stream(split_config_list(config['FINNHUB_STREAM_SYMBOLS']), config['FINNHUB_STREAM_URL'])
+            if self.finnhub_stream:
+                self.finnhub_stream.last_news_id = last_news_id
+            if self.running:
+                self.start_stream()
+        
+        if old_notifier is not self.notifier:
+            request = getattr(old_notifier, 'request', None)
+            if request is not None:
+                try:
+                    await request.shutdown()
+                except Exception as e:
+                    logger.debug(f"关闭旧的电报连接失败: {e}")
+        
+        logger.info(f"已应用新配置: {', '.join(sorted(changed))}")
+    
+    async def reload_config(self):
+        """检查配置文件是否有变化，有则应用"""
+        if not self.config_watcher:
+            return
+        # 配置相关的任何错误都不应中断检查循环
+        try:
+            config = self.config_watcher.poll()
+        except Exception as e:
+            logger.error(f"重新加载配置失败，继续使用原配置: {e}")
+            return
+        if config is None:
+            return
+        try:
+            await self.apply_config(config)
+        except Exception as e:
+            logger.error(f"应用新配置失败: {e}")
+    
+    def is_candidate(self, news_id: str) -> bool:
+        """新闻既未推送过也不在发件箱中"""
+        return self.tracker.is_new(news_id) and not self.outbox.contains(news_id)
+    
+    async def collect_tushare_news(self) -> List[tuple]:
+        """获取 TuShare 新闻，返回待推送的 (新闻ID, 新闻, 来源类型)"""
+        if not self.tushare_collector:
+            return []
+        
         try:
             # 计算时间范围（最近5分钟）
             end_time = datetime.now()
@@ -303,71 +1920,69 @@ class NewsBot:
             
             logger.info(f"检查 TuShare 新闻: {start_date} 到 {end_date}")
             
-            # 获取新闻
-            news_list = self.tushare_collector.get_all_news(start_date, end_date)
+            # 获取新闻（阻塞请求放到线程池，不占用事件循环，实时新闻和发件箱可同时处理）
+            loop = asyncio.get_running_loop()
+            news_list = await loop.run_in_executor(None, self.tushare_collector.get_all_news, start_date, end_date)
+            fetched_at = time.time()
             
             if not news_list:
                 logger.info("未发现 TuShare 新闻")
-                return
+                return []
             
             logger.info(f"发现 {len(news_list)} 条 TuShare 新闻")
             
-            # 推送新新闻
-            sent_count = 0
+            candidates = []
             for news in news_list:
                 # 生成唯一ID
-                news_id = f"tushare_{news.get('src', '')}_{news.get('datetime', '')}_{hash(news.get('title', ''))}"
+                news_id = tushare_news_id(news)
                 
-                if self.tracker.is_new(news_id):
-                    # 推送新闻
-                    success = await self.notifier.send_news(news, source_type='tushare')
-                    if success:
-                        self.tracker.mark_as_sent(news_id)
-                        sent_count += 1
-                    # 避免请求过快
-                    await asyncio.sleep(0.5)
+                if self.is_candidate(news_id):
+                    news['fetched_at'] = fetched_at
+                    candidates.append((news_id, news, 'tushare'))
             
-            logger.info(f"本次推送了 {sent_count} 条 TuShare 新闻")
+            logger.info(f"本次新增 {len(candidates)} 条待推送 TuShare 新闻")
+            return candidates
             
         except Exception as e:
-            logger.error(f"检查和推送 TuShare 新闻时出错: {e}")
+            logger.error(f"检查 TuShare 新闻时出错: {e}")
+            return []
     
-    async def check_and_push_finnhub_news(self):
-        """检查并推送 Finnhub 新闻（每个类别只推送最新一条）"""
+    async def collect_finnhub_news(self) -> List[tuple]:
+        """获取 Finnhub 新闻（每个类别只取最新一条），返回待推送的 (新闻ID, 新闻, 来源类型)"""
         if not self.finnhub_collector:
-            return
+            return []
         
+        candidates = []
         try:
             logger.info("检查 Finnhub 新闻")
             
-            # 按类别分别获取新闻
-            sent_count = 0
-            for category in FINNHUB_CATEGORIES:
+            # 按类别分别获取新闻（阻塞请求放到线程池）
+            loop = asyncio.get_running_loop()
+            for category in self.finnhub_collector.categories:
                 try:
+                    # 熔断中的类别直接跳过
+                    breaker = self.finnhub_collector.breakers.get(f'finnhub_{category}')
+                    if breaker is not None and not breaker.is_available():
+                        logger.debug(f"Finnhub {category} 处于熔断状态，跳过")
+                        continue
+                    
                     # 获取该类别的新闻
-                    news_list = self.finnhub_collector.get_news(category)
+                    news_list = await loop.run_in_executor(None, self.finnhub_collector.get_news, category)
                     
+                    # 没有新闻或返回内容未变化（响应缓存命中）
                     if not news_list or len(news_list) == 0:
-                        logger.info(f"未发现 Finnhub {category} 新闻")
+                        logger.debug(f"未发现 Finnhub {category} 新闻")
                         continue
                     
                     # 只取最新的一条（按时间排序，第一条就是最新的）
                     latest_news = news_list[0]
-                    news_id = f"finnhub_{latest_news.get('id', '')}_{category}"
+                    news_id = finnhub_news_id(latest_news)
                     
-                    # 检查是否已推送
-                    if self.tracker.is_new(news_id):
+                    # 检查是否已推送或已在发件箱中
+                    if self.is_candidate(news_id):
                         logger.info(f"Finnhub {category} 有新新闻: {latest_news.get('headline', '')[:50]}...")
-                        
-                        # 推送新闻
-                        success = await self.notifier.send_news(latest_news, source_type='finnhub')
-                        if success:
-                            self.tracker.mark_as_sent(news_id)
-                            sent_count += 1
-                            logger.info(f"✓ 已推送 Finnhub {category} 最新新闻")
-                        
-                        # 避免请求过快
-                        await asyncio.sleep(0.5)
+                        latest_news['fetched_at'] = time.time()
+                        candidates.append((news_id, latest_news, 'finnhub'))
                     else:
                         logger.debug(f"Finnhub {category} 最新新闻已推送过")
                     
@@ -378,97 +1993,371 @@ class NewsBot:
                     logger.error(f"处理 Finnhub {category} 新闻时出错: {e}")
                     continue
             
-            if sent_count > 0:
-                logger.info(f"本次推送了 {sent_count} 条 Finnhub 新闻")
+            if candidates:
+                logger.info(f"本次新增 {len(candidates)} 条待推送 Finnhub 新闻")
             else:
                 logger.info("没有新的 Finnhub 新闻需要推送")
             
         except Exception as e:
-            logger.error(f"检查和推送 Finnhub 新闻时出错: {e}")
+            logger.error(f"检查 Finnhub 新闻时出错: {e}")
+        return candidates
+    
+    async def collect_rss_news(self) -> List[tuple]:
+        """获取 RSS/Atom 订阅源新闻，返回待推送的 (新闻ID, 新闻, 来源类型)"""
+        if not self.rss_collector:
+            return []
+        
+        try:
+            logger.info("检查 RSS 订阅源")
+            loop = asyncio.get_running_loop()
+            news_list = await loop.run_in_executor(None, self.rss_collector.get_all_news)
+            fetched_at = time.time()
+            
+            candidates = []
+            for news in news_list:
+                news_id = f"rss_{news.get('src', '')}_{news.get('id', '')}"
+                if self.is_candidate(news_id):
+                    news['fetched_at'] = fetched_at
+                    candidates.append((news_id, news, 'rss'))
+            
+            if candidates:
+                logger.info(f"本次新增 {len(candidates)} 条待推送 RSS 新闻")
+            return candidates
+            
+        except Exception as e:
+            logger.error(f"检查 RSS 新闻时出错: {e}")
+            return []
+    
+    async def handle_stream_news(self, news: Dict):
+        """处理 Finnhub 实时推送的新闻：写入发件箱，由后台发送任务推送"""
+        news_id = finnhub_news_id(news)
+        if self.tracker.is_new(news_id) and self.outbox.enqueue(news_id, news, 'finnhub'):
+            logger.info(f"Finnhub 实时新闻: {news.get('headline', '')[:50]}...")
+            self.outbox_event.set()
     
     async def check_and_push_news(self):
-        """检查并推送所有新闻"""
-        # 检查 TuShare 新闻
-        await self.check_and_push_tushare_news()
+        """检查所有来源，按发布时间从旧到新写入发件箱，由后台发送任务推送"""
+        candidates = []
+        candidates.extend(await self.collect_tushare_news())
+        candidates.extend(await self.collect_finnhub_news())
+        candidates.extend(await self.collect_rss_news())
         
-        # 检查 Finnhub 新闻
-        await self.check_and_push_finnhub_news()
+        # 各来源的时间格式和时区不同，统一换算为 UTC 后按发布时间归并
+        queued_count = 0
+        for news_id, news, source_type in merge_by_event_time(candidates):
+            if self.outbox.enqueue(news_id, news, source_type, save=False):
+                queued_count += 1
+        if queued_count > 0:
+            self.outbox.save_outbox()
+            self.outbox_event.set()
         
         # 更新最后检查时间
         self.last_check_time = datetime.now()
+        self.save_cursor()
+        
+        self.log_source_health()
+        
+        # 统计信息按间隔输出，避免每轮都写入多行日志
+        self.cycle_count += 1
+        if self.cycle_count % self.stats_log_cycles == 0:
+            self.log_cache_stats()
+            self.log_credential_usage()
+            self.log_transport_stats()
+            self.log_latency_stats()
+    
+    def log_latency_stats(self):
+        """输出从发布到各阶段的延迟分布"""
+        for stage, stats in self.tracer.stats().items():
+            logger.info(
+                f"新闻延迟（发布到{LatencyTracer.STAGE_NAMES[stage]}）: {stats['count']} 条, p50 {stats['p50']:.1f} 秒, "
+                f"p95 {stats['p95']:.1f} 秒, 最长 {stats['max']:.1f} 秒"
+            )
+    
+    def log_transport_stats(self):
+        """输出电报连接池使用情况"""
+        request = getattr(self.notifier, 'request', None)
+        if not isinstance(request, InstrumentedRequest) or request.requests == 0:
+            return
+        stats = request.stats()
+        logger.info(
+            f"电报连接池: 大小 {stats['pool_size']}, 请求 {stats['requests']} 次, "
+            f"最大并发 {stats['peak_in_flight']}, 占满 {stats['saturated']} 次, 等待超时 {stats['pool_timeouts']} 次, "
+            f"平均等待 {stats['avg_wait_ms']:.1f} ms, 最长等待 {stats['max_wait_ms']:.1f} ms"
+        )
+    
+    def log_credential_usage(self):
+        """输出每个 Token 的使用情况"""
+        for collector in (self.tushare_collector, self.finnhub_collector):
+            if not collector:
+                continue
+            pool = collector.credentials
+            for masked, stats in pool.stats().items():
+                status = "隔离中" if stats['quarantined'] else "正常"
+                logger.info(
+                    f"{pool.provider} Token {masked}: 调用 {stats['calls']} 次, 错误 {stats['errors']} 次, "
+                    f"剩余额度 {stats['headroom']}/分钟, {status}"
+                )
+    
+    def log_cache_stats(self):
+        """输出响应缓存命中率"""
+        for name, collector in (('TuShare', self.tushare_collector), ('Finnhub', self.finnhub_collector)):
+            if collector:
+                stats = collector.response_cache.stats()
+                logger.info(
+                    f"{name} 响应缓存: 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, "
+                    f"命中率 {stats['hit_rate']:.1%}, 跳过 {stats['bytes_skipped']} 字节"
+                )
+    
+    def log_source_health(self):
+        """输出处于熔断状态的来源"""
+        breakers = []
+        if self.tushare_collector:
+            breakers.extend(self.tushare_collector.breakers.values())
+        if self.finnhub_collector:
+            breakers.extend(self.finnhub_collector.breakers.values())
+        if self.rss_collector:
+            breakers.extend(self.rss_collector.breakers.values())
+        
+        for breaker in breakers:
+            if breaker.state != CircuitBreaker.CLOSED:
+                logger.warning(
+                    f"来源 {SOURCE_NAMES.get(breaker.name, breaker.name)} 熔断中: "
+                    f"成功 {breaker.total_successes} 次, 失败 {breaker.total_failures} 次, "
+                    f"跳过 {breaker.total_skipped} 次"
+                )
+    
+    async def drain_outbox(self) -> int:
+        """推送发件箱中所有到期的新闻，返回成功推送的数量"""
+        # 被电报限流期间暂停发送
+        if time.time() < self.flood_until:
+            return 0
+        
+        sent_count = 0
+        for entry in self.outbox.due_entries():
+            news_id = entry['id']
+            
+            # 幂等：已推送过的新闻直接确认，不再重复发送
+            if not self.tracker.is_new(news_id):
+                self.outbox.ack(news_id)
+                continue
+            
+            # 只发送到尚未成功的聊天，避免部分失败重试时其他聊天收到重复消息
+            async with self.send_lock:
+                chat_ids = self.outbox.undelivered_chats(news_id, self.notifier.chat_ids)
+                results = await self.notifier.send_news_to_chats(entry['news'], entry['source_type'], chat_ids)
+            delivered = [chat_id for chat_id, error in results.items() if error is None]
+            errors = [error for error in results.values() if error is not None]
+            if not errors:
+                self.tracker.mark_as_sent(news_id)
+                self.tracer.record(entry)
+                self.outbox.ack(news_id)
+                sent_count += 1
+            else:
+                # 永久性错误直接移入死信文件；被限流时按电报要求的时间暂停所有发送
+                permanent = [error for error in errors if TelegramNotifier.is_permanent_error(error)]
+                retry_after = max(
+                    (seconds for seconds in map(TelegramNotifier.retry_after_seconds, errors) if seconds is not None),
+                    default=None
+                )
+                if permanent:
+                    self.outbox.reject(news_id, delivered, f"{type(permanent[0]).__name__}: {permanent[0]}")
+                else:
+                    self.outbox.nack(news_id, delivered, retry_after)
+                if retry_after is not None:
+                    self.flood_until = time.time() + retry_after
+                    break
+            
+            # 避免请求过快
+            await asyncio.sleep(0.5)
+        
+        if sent_count > 0:
+            logger.info(f"本次从发件箱推送了 {sent_count} 条新闻")
+        return sent_count
+    
+    async def deliver_outbox(self, poll_interval: float = 1.0):
+        """后台发送任务：持续推送发件箱中的新闻，失败的新闻按退避时间重试"""
+        while self.running:
+            try:
+                await self.drain_outbox()
+            except Exception as e:
+                logger.error(f"推送发件箱新闻时出错: {e}")
+            
+            # 等待新新闻入队或到达下一次重试检查时间
+            try:
+                await asyncio.wait_for(self.outbox_event.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.outbox_event.clear()
     
-    async def run(self, check_interval: int = 60):
+    async def run(self, check_interval: Optional[int] = None):
         """运行机器人"""
         self.running = True
-        logger.info(f"新闻机器人启动，检查间隔: {check_interval} 秒")
+        if check_interval is not None:
+            self.check_interval = check_interval
+        logger.info(f"新闻机器人启动，检查间隔: {self.check_interval} 秒")
+        
+        # 启动后台发送任务（会先补发上次未完成的新闻）
+        sender_task = asyncio.create_task(self.deliver_outbox())
+        self.start_stream()
         
         try:
             while self.running:
                 await self.check_and_push_news()
-                await asyncio.sleep(check_interval)
+                await asyncio.sleep(self.check_interval)
+                await self.reload_config()
         except KeyboardInterrupt:
             logger.info("收到停止信号，正在关闭...")
             self.running = False
         except Exception as e:
             logger.error(f"机器人运行出错: {e}")
             self.running = False
+        finally:
+            await self.stop_stream()
+            sender_task.cancel()
+            try:
+                await sender_task
+            except asyncio.CancelledError:
+                pass
     
     def stop(self):
         """停止机器人"""
         self.running = False
+        if self.finnhub_stream:
+            self.finnhub_stream.stop()
         logger.info("机器人已停止")
 
 
 async def main():
     """主函数"""
-    # 从环境变量读取配置
-    tushare_token = os.getenv('TUSHARE_TOKEN')
-    finnhub_token = os.getenv('FINNHUB_TOKEN')
-    telegram_token = os.getenv('TELEGRAM_TOKEN')
-    telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
-    check_interval = int(os.getenv('CHECK_INTERVAL', '60'))
-    
-    # 验证配置
-    if not telegram_token:
-        logger.error("未设置 TELEGRAM_TOKEN 环境变量")
+    # 从环境变量和配置文件读取并验证配置
+    config_file = os.getenv('CONFIG_FILE', 'config.json')
+    try:
+        config = load_config(config_file)
+    except (ValueError, OSError) as e:
+        logger.error(f"配置错误: {e}")
         sys.exit(1)
     
-    if not telegram_chat_id:
-        logger.error("未设置 TELEGRAM_CHAT_ID 环境变量")
+    state_lock = StateLock()
+    if not state_lock.acquire():
+        logger.error(f"已有机器人或回填命令在运行（锁文件 {state_lock.lock_file}），请先停止")
         sys.exit(1)
     
-    if not tushare_token and not finnhub_token:
-        logger.error("至少需要设置 TUSHARE_TOKEN 或 FINNHUB_TOKEN 中的一个")
-        sys.exit(1)
+    tushare_token = config['TUSHARE_TOKEN']
+    finnhub_token = config['FINNHUB_TOKEN']
+    telegram_token = config['TELEGRAM_TOKEN']
+    telegram_chat_id = config['TELEGRAM_CHAT_ID']
+    check_interval = config['CHECK_INTERVAL']
+    hedge_delay = config['HEDGE_DELAY']
+    stream_symbols = split_config_list(config['FINNHUB_STREAM_SYMBOLS'])
+    telegram_options = telegram_options_from_config(config)
     
     logger.info("=" * 50)
     logger.info("QuickFinews - 财经新闻实时推送机器人")
     logger.info("=" * 50)
     
     if tushare_token:
-        logger.info(f"TuShare Token: {tushare_token[:10]}...")
+        logger.info(f"TuShare Token: {tushare_token[:10]}... (共 {len(CredentialPool.parse_tokens(tushare_token))} 个)")
     else:
         logger.info("TuShare: 未启用")
     
     if finnhub_token:
-        logger.info(f"Finnhub Token: {finnhub_token[:10]}...")
+        logger.info(f"Finnhub Token: {finnhub_token[:10]}... (共 {len(CredentialPool.parse_tokens(finnhub_token))} 个)")
+        if stream_symbols:
+            logger.info(f"Finnhub 实时新闻: {', '.join(stream_symbols)}")
     else:
         logger.info("Finnhub: 未启用")
     
+    # 创建机器人
+    bot = NewsBot.from_config(config)
+    bot.config_watcher = ConfigWatcher(config_file)
+    
+    if RSS_FEEDS:
+        logger.info(f"RSS 订阅源: {', '.join(SOURCE_NAMES.get(key, key) for key in RSS_FEEDS)}")
+    
     logger.info(f"Telegram Chat ID: {telegram_chat_id}")
+    logger.info(
+        f"电报连接池: {telegram_options['pool_size']}, HTTP/2: {'是' if telegram_options['http2'] else '否'}"
+        + (f", Bot API: {telegram_options['api_url']}" if telegram_options['api_url'] else "")
+    )
     logger.info(f"检查间隔: {check_interval} 秒")
+    if hedge_delay > 0:
+        logger.info(f"对冲请求延迟: {hedge_delay} 秒")
+    logger.info(f"配置文件: {config_file}（修改后自动生效）")
     logger.info("=" * 50)
     
-    # 创建机器人
-    bot = NewsBot(tushare_token, finnhub_token, telegram_token, telegram_chat_id)
-    
     # 运行机器人
     try:
-        await bot.run(check_interval=check_interval)
+        await bot.run()
     except KeyboardInterrupt:
         logger.info("收到中断信号，正在关闭...")
         bot.stop()
+    finally:
+        state_lock.release()
+
+
+def parse_datetime_arg(value: str) -> datetime:
+    """解析命令行中的日期或日期时间"""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"无法解析时间: {value}")
+
+
+def backfill_main(argv: List[str]):
+    """历史新闻回填命令行入口"""
+    parser = argparse.ArgumentParser(prog='main.py backfill', description='回填 TuShare 历史新闻')
+    parser.add_argument('--start', type=parse_datetime_arg, required=True, help='开始时间，如 2026-01-01')
+    parser.add_argument('--end', type=parse_datetime_arg, default=datetime.now(), help='结束时间，默认为当前时间')
+    parser.add_argument('--sources', default=None, help='逗号分隔的来源，默认使用配置中的 TUSHARE_SOURCES')
+    parser.add_argument('--chunk-hours', type=float, default=6, help='每个分块的小时数')
+    parser.add_argument('--workers', type=int, default=4, help='并行请求数')
+    parser.add_argument('--calls-per-minute', type=int, default=100, help='每个 TuShare Token 每分钟调用配额')
+    parser.add_argument('--checkpoint', default='backfill_checkpoint.json', help='检查点文件')
+    parser.add_argument('--archive', default='news_archive.jsonl', help='归档文件')
+    parser.add_argument('--push', action='store_true', help='将回填的新闻写入发件箱推送，默认只标记为已推送')
+    args = parser.parse_args(argv)
+    
+    # 与机器人相同：环境变量为基础，配置文件中的同名项覆盖环境变量
+    try:
+        config = load_config(os.getenv('CONFIG_FILE', 'config.json'), require_bot=False)
+    except (ValueError, OSError) as e:
+        logger.error(f"配置错误: {e}")
+        sys.exit(1)
+    
+    tushare_token = config['TUSHARE_TOKEN']
+    if not tushare_token:
+        logger.error("未设置 TUSHARE_TOKEN（环境变量或配置文件）")
+        sys.exit(1)
+    
+    # 运行中的机器人会用内存中的状态覆盖历史记录和发件箱，回填前必须先停止机器人
+    state_lock = StateLock()
+    if not state_lock.acquire():
+        logger.error(f"机器人正在运行（锁文件 {state_lock.lock_file}），请先停止机器人再回填")
+        sys.exit(1)
+    
+    collector = TuShareCollector(tushare_token, calls_per_minute=args.calls_per_minute)
+    backfill = TuShareBackfill(
+        collector,
+        NewsTracker(),
+        outbox=NewsOutbox() if args.push else None,
+        archive_file=args.archive,
+        checkpoint_file=args.checkpoint,
+        workers=args.workers,
+        calls_per_minute=args.calls_per_minute * len(collector.credentials.tokens),
+        chunk_hours=args.chunk_hours
+    )
+    sources = split_config_list(args.sources if args.sources is not None else config['TUSHARE_SOURCES'])
+    try:
+        stats = backfill.run(args.start, args.end, sources)
+    finally:
+        state_lock.release()
+    sys.exit(1 if stats['failed'] else 0)
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    if len(sys.argv) > 1 and sys.argv[1] == 'backfill':
+        backfill_main(sys.argv[2:])
+    else:
+        asyncio.run(main())
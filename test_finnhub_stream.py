@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 Finnhub 实时新闻的重连和补齐逻辑（使用本地模拟服务器，无需网络）
+"""
+
+import os
+import sys
+import logging
+import asyncio
+import tempfile
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from main import FinnhubCollector, FinnhubStreamCollector, NewsBot
+from finnhub_stub_server import FinnhubStubServer
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def wait_for(condition, timeout: float = 10.0) -> bool:
+    """等待条件成立"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def test_stream_reconnect():
+    """测试断线重连和补齐"""
+    logger.info("=" * 50)
+    logger.info("测试 Finnhub 实时新闻重连和补齐")
+    logger.info("=" * 50)
+    
+    server = FinnhubStubServer()
+    await server.start()
+    
+    received = []
+    
+    async def on_news(news):
+        received.append(news['id'])
+    
+    rest_collector = FinnhubCollector('test_token')
+    rest_collector.base_url = server.rest_url
+    stream = FinnhubStreamCollector(
+        'test_token', ['AAPL'], rest_collector, on_news,
+        ws_url=server.ws_url, backoff_base=0.1, backoff_max=0.5
+    )
+    stream_task = asyncio.create_task(stream.run())
+    
+    try:
+        # 1. 正常推送
+        if not await wait_for(lambda: server.connection_count == 1 and server.clients):
+            logger.error("✗ 未能连接到模拟服务器")
+            return False
+        await server.publish('新闻 1')
+        await server.publish('新闻 2')
+        if not await wait_for(lambda: len(received) == 2):
+            logger.error(f"✗ 未收到实时新闻: {received}")
+            return False
+        logger.info(f"  ✓ 实时收到新闻: {received}")
+        
+        # 2. 断线期间发布的新闻
+        await server.drop_connections()
+        await server.publish('新闻 3')
+        await server.publish('新闻 4')
+        await asyncio.sleep(0.5)
+        
+        # 3. 恢复后应自动重连并补齐
+        server.resume()
+        if not await wait_for(lambda: len(received) >= 4):
+            logger.error(f"✗ 重连后未补齐新闻: {received}")
+            return False
+        await server.publish('新闻 5')
+        if not await wait_for(lambda: len(received) >= 5):
+            logger.error(f"✗ 重连后未收到实时新闻: {received}")
+            return False
+        
+        if received != [1, 2, 3, 4, 5]:
+            logger.error(f"✗ 新闻顺序或数量不正确: {received}")
+            return False
+        
+        logger.info(f"  ✓ 重连 {stream.reconnect_count} 次，补齐 {stream.gap_filled_count} 条新闻")
+        logger.info(f"  ✓ 共收到新闻: {received}")
+        return True
+    
+    finally:
+        stream.stop()
+        stream_task.cancel()
+        try:
+            await stream_task
+        except asyncio.CancelledError:
+            pass
+        await server.stop()
+
+
+class CountingNotifier:
+    """模拟电报通知器，记录推送的新闻ID"""
+    
+    def __init__(self):
+        self.chat_ids = ['-1']
+        self.sent = []
+    
+    async def send_news_to_chats(self, news, source_type, chat_ids):
+        self.sent.append(news['id'])
+        return {chat_id: None for chat_id in chat_ids}
+
+
+async def test_poll_and_gap_fill_dedup():
+    """测试轮询已推送的新闻在重连补齐时不会重复推送，且补齐数量有上限"""
+    logger.info("=" * 50)
+    logger.info("测试轮询与重连补齐去重")
+    logger.info("=" * 50)
+    
+    server = FinnhubStubServer()
+    await server.start()
+    
+    # 在临时目录中运行，避免写入真实的历史记录和发件箱
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix='quickfinews_stream_'))
+    try:
+        bot = NewsBot('', 'test_token', '123456:test', '-1', finnhub_categories=['general'])
+        bot.finnhub_collector.base_url = server.rest_url
+        bot.notifier = CountingNotifier()
+        stream = FinnhubStreamCollector(
+            'test_token', ['AAPL'], bot.finnhub_collector, bot.handle_stream_news, gap_fill_limit=3
+        )
+        stream.last_news_id = 1
+        
+        # 1. 轮询推送该类别最新的一条（ID 2）
+        await server.publish('新闻 1')
+        await server.publish('新闻 2')
+        await bot.check_and_push_news()
+        await bot.drain_outbox()
+        if bot.notifier.sent != [2]:
+            logger.error(f"✗ 轮询推送不正确: {bot.notifier.sent}")
+            return False
+        
+        # 2. 重连补齐返回同一条新闻，不应再次推送
+        await stream.fill_gap()
+        await bot.drain_outbox()
+        if bot.notifier.sent != [2]:
+            logger.error(f"✗ 补齐时重复推送了轮询已推送的新闻: {bot.notifier.sent}")
+            return False
+        logger.info("  ✓ 轮询已推送的新闻在补齐时被去重")
+        
+        # 3. 长时间断线后只补推最新的若干条
+        stream.last_news_id = 2
+        for i in range(3, 11):
+            await server.publish(f'新闻 {i}')
+        await stream.fill_gap()
+        await bot.drain_outbox()
+        if bot.notifier.sent != [2, 8, 9, 10]:
+            logger.error(f"✗ 补齐数量或顺序不正确: {bot.notifier.sent}")
+            return False
+        logger.info(f"  ✓ 补齐数量受限，共推送: {bot.notifier.sent}")
+        return True
+    
+    finally:
+        os.chdir(cwd)
+        await server.stop()
+
+
+async def main():
+    """主函数"""
+    success = await test_stream_reconnect() and await test_poll_and_gap_fill_dedup()
+    
+    if success:
+        logger.info("")
+        logger.info("✓ 测试通过！断线重连和补齐工作正常。")
+        sys.exit(0)
+    else:
+        logger.error("")
+        logger.error("✗ 测试失败。")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
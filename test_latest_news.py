@@ -16,7 +16,7 @@ from datetime import datetime
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(__file__))
 
-from main import FinnhubCollector, TelegramNotifier, NewsTracker, FINNHUB_CATEGORIES, SOURCE_NAMES
+from main import FinnhubCollector, TelegramNotifier, NewsTracker, FINNHUB_CATEGORIES, SOURCE_NAMES, finnhub_news_id
 
 # 配置日志
 logging.basicConfig(
@@ -71,7 +71,7 @@ async def test_latest_news_logic():
                 
                 # 只取最新的一条
                 latest_news = news_list[0]
-                news_id = f"finnhub_{latest_news.get('id', '')}_{category}"
+                news_id = finnhub_news_id(latest_news)
                 
                 headline = latest_news.get('headline', '')
                 source = latest_news.get('source', '')
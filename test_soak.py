@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+QuickFinews 长时间运行（浸泡）测试
+使用虚拟时钟和模拟的 TuShare / Finnhub 数据，把一周的运行压缩到几分钟内，
+检查内存增长、状态文件大小、每轮耗时漂移和重启耗时
+
+每轮依次调用 check_and_push_news、drain_outbox 和 reload_config，模拟 NewsBot.run() 的一轮；
+不运行 run() 本身和后台发送任务 deliver_outbox（其中的 asyncio.wait_for 使用真实时间，无法用虚拟时钟加速），
+因此不覆盖真实循环中检查与发送并发执行时的时序
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import asyncio
+import tempfile
+import resource
+from datetime import datetime as real_datetime
+from typing import Dict, List
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PROJECT_DIR)
+
+import pandas as pd
+import main
+from main import NewsBot, ConfigWatcher
+
+logger = logging.getLogger('soak')
+logger.propagate = False
+console = logging.StreamHandler()
+console.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+logger.addHandler(console)
+logger.setLevel(logging.INFO)
+
+
+class VirtualClock:
+    """虚拟时钟 - sleep 立即返回并推进时间"""
+    
+    def __init__(self, start: float):
+        self.now = start
+        self.slept = 0.0
+    
+    def time(self) -> float:
+        return self.now
+    
+    def monotonic(self) -> float:
+        return self.now
+    
+    def sleep_sync(self, delay: float):
+        self.now += max(0.0, delay)
+        self.slept += max(0.0, delay)
+    
+    async def sleep(self, delay: float, result=None):
+        self.sleep_sync(delay)
+        # 让出事件循环，但不真正等待
+        await asyncio.sleep(0)
+        return result
+
+
+class ModuleProxy:
+    """替换模块中的部分函数，其余属性仍使用原模块"""
+    
+    def __init__(self, module, **overrides):
+        self._module = module
+        self.__dict__.update(overrides)
+    
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+def install_clock(clock: VirtualClock):
+    """把虚拟时钟注入 main 模块使用的 datetime / time / asyncio"""
+    
+    class VirtualDatetime(real_datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls.fromtimestamp(clock.now, tz)
+    
+    main.datetime = VirtualDatetime
+    main.time = ModuleProxy(time, time=clock.time, monotonic=clock.monotonic, sleep=clock.sleep_sync)
+    main.asyncio = ModuleProxy(asyncio, sleep=clock.sleep)
+
+
+class FakeTuSharePro:
+    """模拟 TuShare pro 接口：每个来源按固定间隔产生新闻"""
+    
+    def __init__(self, items_per_hour: float):
+        self.period = 3600.0 / items_per_hour
+        self.calls = 0
+    
+    def news(self, src: str, start_date: str, end_date: str):
+        self.calls += 1
+        start = real_datetime.strptime(start_date, '%Y-%m-%d %H:%M:%S').timestamp()
+        end = real_datetime.strptime(end_date, '%Y-%m-%d %H:%M:%S').timestamp()
+        offset = sum(map(ord, src)) % int(self.period)
+        
+        rows = []
+        k = int((start - offset) // self.period)
+        while True:
+            ts_value = k * self.period + offset
+            if ts_value > end:
+                break
+            if ts_value >= start:
+                rows.append({
+                    'datetime': real_datetime.fromtimestamp(ts_value).strftime('%Y-%m-%d %H:%M:%S'),
+                    'content': f'{src} 模拟新闻正文 {k} ' * 10,
+                    'title': f'{src} 模拟新闻 {k}'
+                })
+            k += 1
+        return pd.DataFrame(rows, columns=['datetime', 'content', 'title'])
+
+
+class FakeResponse:
+    """模拟 requests 响应"""
+    
+    def __init__(self, payload: List[Dict]):
+        self.status_code = 200
+        self.headers = {}
+        self.content = json.dumps(payload).encode('utf-8')
+    
+    def json(self):
+        return json.loads(self.content)
+    
+    def raise_for_status(self):
+        pass
+
+
+class FakeFinnhub:
+    """模拟 Finnhub /news：每个类别返回最新 100 条，按固定间隔产生新新闻"""
+    
+    def __init__(self, clock: VirtualClock, period_minutes: float):
+        self.clock = clock
+        self.period = period_minutes * 60
+        self.calls = 0
+    
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.calls += 1
+        category = params.get('category', 'general')
+        latest = int(self.clock.now // self.period)
+        payload = [
+            {
+                'id': k * 10 + main.FINNHUB_CATEGORIES.index(category),
+                'category': category,
+                'datetime': int(k * self.period),
+                'headline': f'{category} headline {k}',
+                'summary': f'{category} summary {k} ' * 10,
+                'source': 'soak',
+                'url': f'https://example.com/{category}/{k}'
+            }
+            for k in range(latest, latest - 100, -1)
+        ]
+        return FakeResponse(payload)
+
+
+class FakeNotifier:
+    """模拟电报通知器，只计数"""
+    
+    def __init__(self):
+        self.chat_ids = ['-1']
+        self.sent = 0
+    
+    async def send_news_to_chats(self, news: Dict, source_type: str, chat_ids: List[str]) -> Dict:
+        self.sent += 1
+        return {chat_id: None for chat_id in chat_ids}
+
+
+def current_rss_mb() -> float:
+    """当前进程的常驻内存（MB）"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        # 非 Linux 环境退回到峰值内存
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def enter_work_dir() -> str:
+    """切换到临时目录运行，应用日志只写入该目录，避免污染真实的历史记录和日志"""
+    work_dir = tempfile.mkdtemp(prefix='quickfinews_soak_')
+    os.chdir(work_dir)
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    file_handler = logging.FileHandler(os.path.join(work_dir, 'quickfinews.log'))
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    root.addHandler(file_handler)
+    return work_dir
+
+
+def file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def create_bot(tushare_pro: FakeTuSharePro, notifier: FakeNotifier) -> NewsBot:
+    """创建使用模拟数据源的机器人"""
+    bot = NewsBot('soak_tushare', 'soak_finnhub', '123456:soak', '-1')
+    bot.tushare_collector.clients = {token: tushare_pro for token in bot.tushare_collector.clients}
+    bot.tushare_collector.pro = tushare_pro
+    bot.notifier = notifier
+    return bot
+
+
+def measure_startup(tushare_pro: FakeTuSharePro, notifier: FakeNotifier) -> float:
+    """测量加载状态文件并创建机器人的耗时（毫秒）"""
+    started = time.perf_counter()
+    create_bot(tushare_pro, notifier)
+    return (time.perf_counter() - started) * 1000
+
+
+async def run_soak(args) -> bool:
+    """执行浸泡测试"""
+    work_dir = enter_work_dir()
+    clock = VirtualClock(time.time())
+    install_clock(clock)
+    finnhub = FakeFinnhub(clock, args.finnhub_period_minutes)
+    main.requests = ModuleProxy(main.requests, get=finnhub.get)
+    tushare_pro = FakeTuSharePro(args.tushare_per_hour)
+    notifier = FakeNotifier()
+    
+    logger.info("=" * 50)
+    logger.info(f"浸泡测试: 模拟 {args.days} 天, 检查间隔 {args.interval} 秒")
+    logger.info(f"工作目录: {work_dir}")
+    logger.info("=" * 50)
+    
+    startup_before_ms = measure_startup(tushare_pro, notifier)
+    bot = create_bot(tushare_pro, notifier)
+    bot.config_watcher = ConfigWatcher(os.path.join(work_dir, 'config.json'))
+    bot.running = True
+    
+    cycles_per_day = int(86400 / args.interval)
+    rss_start = current_rss_mb()
+    report = []
+    real_started = time.perf_counter()
+    
+    for day in range(1, args.days + 1):
+        cycle_times = []
+        for _ in range(cycles_per_day):
+            cycle_started = time.perf_counter()
+            await bot.check_and_push_news()
+            await bot.drain_outbox()
+            await bot.reload_config()
+            cycle_times.append((time.perf_counter() - cycle_started) * 1000)
+            await clock.sleep(args.interval)
+        
+        row = {
+            'day': day,
+            'sent': notifier.sent,
+            'tracked_ids': len(bot.tracker.news_ids),
+            'pending': len(bot.outbox.pending),
+            'state_bytes': file_size(bot.tracker.history_file) + file_size(bot.outbox.outbox_file),
+            'log_bytes': file_size('quickfinews.log'),
+            'rss_mb': current_rss_mb(),
+            'avg_cycle_ms': sum(cycle_times) / len(cycle_times),
+            'max_cycle_ms': max(cycle_times)
+        }
+        report.append(row)
+        logger.info(
+            f"第 {day} 天: 已推送 {row['sent']}, 去重记录 {row['tracked_ids']}, "
+            f"状态文件 {row['state_bytes'] / 1024:.0f} KB, 日志 {row['log_bytes'] / 1024:.0f} KB, "
+            f"内存 {row['rss_mb']:.1f} MB, 平均每轮 {row['avg_cycle_ms']:.1f} ms"
+        )
+    
+    startup_after_ms = measure_startup(tushare_pro, notifier)
+    rss_growth = current_rss_mb() - rss_start
+    state_mb = report[-1]['state_bytes'] / 1024 / 1024
+    cycle_drift = report[-1]['avg_cycle_ms'] / max(report[0]['avg_cycle_ms'], 0.001)
+    
+    summary = {
+        'days': args.days,
+        'interval': args.interval,
+        'real_seconds': time.perf_counter() - real_started,
+        'tushare_calls': tushare_pro.calls,
+        'finnhub_calls': finnhub.calls,
+        'rss_growth_mb': rss_growth,
+        'state_mb': state_mb,
+        'cycle_drift': cycle_drift,
+        'startup_before_ms': startup_before_ms,
+        'startup_after_ms': startup_after_ms,
+        'daily': report
+    }
+    report_file = os.path.join(work_dir, args.report)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    
+    logger.info("=" * 50)
+    logger.info(f"实际耗时: {summary['real_seconds']:.1f} 秒, 趋势报告: {report_file}")
+    
+    checks = [
+        ('内存增长', rss_growth, args.max_rss_growth_mb, 'MB'),
+        ('状态文件大小', state_mb, args.max_state_mb, 'MB'),
+        ('每轮耗时漂移', cycle_drift, args.max_cycle_drift, '倍'),
+        ('重启耗时', startup_after_ms, args.max_startup_ms, 'ms')
+    ]
+    all_passed = True
+    for name, value, limit, unit in checks:
+        passed = value <= limit
+        all_passed = all_passed and passed
+        status = "✓" if passed else "✗"
+        logger.info(f"{status} {name}: {value:.2f} {unit} (上限 {limit} {unit})")
+    logger.info("=" * 50)
+    return all_passed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='QuickFinews 浸泡测试')
+    parser.add_argument('--days', type=int, default=7, help='模拟天数')
+    parser.add_argument('--interval', type=int, default=60, help='模拟的检查间隔（秒）')
+    parser.add_argument('--tushare-per-hour', type=float, default=4, help='每个 TuShare 来源每小时的新闻数')
+    parser.add_argument('--finnhub-period-minutes', type=float, default=30, help='Finnhub 每个类别产生新新闻的间隔（分钟）')
+    parser.add_argument('--max-rss-growth-mb', type=float, default=100, help='内存增长上限（MB）')
+    parser.add_argument('--max-state-mb', type=float, default=10, help='状态文件大小上限（MB）')
+    parser.add_argument('--max-cycle-drift', type=float, default=3.0, help='最后一天与第一天平均每轮耗时之比的上限')
+    parser.add_argument('--max-startup-ms', type=float, default=1000, help='模拟结束后重启耗时上限（毫秒）')
+    parser.add_argument('--report', default='soak_report.json', help='趋势报告文件')
+    return parser.parse_args()
+
+
+async def main_async():
+    """主函数"""
+    success = await run_soak(parse_args())
+    
+    if success:
+        logger.info("✓ 浸泡测试通过！")
+        sys.exit(0)
+    else:
+        logger.error("✗ 浸泡测试未通过，请查看趋势报告。")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main_async())